@@ -1,7 +1,7 @@
 import copy
 
 from musical.theory import Note
-from musical.audio.playback import play
+from musical.audio.playback import Player
 from musical.audio import Hit
 
 ROLL_DICT = {
@@ -47,19 +47,20 @@ def render_roll(roll, note_length):
     Returns:
         rendered notes (a wave-form that is played with an audio synthesizer)
     """
-    return [Hit(note=note, length=note_length).render() for note in roll]
+    return Hit.render_many(Hit(note=note, length=note_length) for note in roll)
 
 
 def play_roll(roll):
-    """Play each note in a rendered roll sequentially"""
-    for note in roll:
-        play(note)
+    """Play each note in a rendered roll sequentially, without reopening the mixer between notes"""
+    with Player() as player:
+        player.start(roll)
+        player.wait()
 
 
-def fret_strings(chord):
+def fret_strings(chord, tuning=BANJO_TUNING):
     """
-    Fret strings pulls BANJO_TUNING from the global namespace and frets the strings
-    according to the supplied chord.
+    Fret strings frets the strings of a tuning (BANJO_TUNING by default) according to the
+    supplied chord.
 
     chord: a tuple which maps the depressed fret to the banjo string, according to the schema:
         chord = (
@@ -71,11 +72,11 @@ def fret_strings(chord):
         )
     Args:
         chord: a tuple of depressed frets
+        tuning: a dictionary mapping banjo strings to their open Notes
     Returns:
         A dictionary of banjo strings mapped to the note after the chord has been applied.
     """
-    global BANJO_TUNING
-    fretted_strings = dict(BANJO_TUNING)
+    fretted_strings = dict(tuning)
 
     for str_idx, fret in enumerate(chord):
         banjo_string = str_idx + 1
@@ -110,7 +111,7 @@ def make_gamma_seven(chord):
 def make_gamma_minor_seven(chord):
     pass
 
-def generate_moveable_chords(file_name=None):
+def generate_moveable_chords(file_name=None, tuning=BANJO_TUNING):
     """
     Given the first location of moveable chords represented as a tuple:
         chord = (
@@ -129,6 +130,7 @@ def generate_moveable_chords(file_name=None):
     Args:
         file_name: A string that contains the full path to the file to serialize the generated
         chords.
+        tuning: a dictionary mapping banjo strings to their open Notes
 
     Returns:
         A dictionary mapping the normalized Note name (representing the pitch of the chord) to the
@@ -154,9 +156,9 @@ def generate_moveable_chords(file_name=None):
         beta = tuple([banjo_string + fret_position if string_idx != 4 else banjo_string for string_idx, banjo_string in enumerate(first_beta)])
         gamma = tuple([banjo_string + fret_position if string_idx != 4 else banjo_string for string_idx, banjo_string in enumerate(first_gamma)])
 
-        fretted_alpha = fret_strings(alpha)
-        fretted_beta = fret_strings(beta)
-        fretted_gamma = fret_strings(gamma)
+        fretted_alpha = fret_strings(alpha, tuning)
+        fretted_beta = fret_strings(beta, tuning)
+        fretted_gamma = fret_strings(gamma, tuning)
         
         # Make sure we're not playing frets that don't exist
         if any([fret > 22 for fret in alpha]) and any([fret < 0 for fret in alpha]):
@@ -0,0 +1,58 @@
+import timeit
+
+import numpy
+
+from musical.audio import effect
+from musical.audio import source
+
+
+def modulated_delay_loop(data, modwave, dry, wet):
+    ''' Reference per-sample loop, as effect.modulated_delay used to be
+        implemented.
+    '''
+    out = data.copy()
+    for i in range(len(data)):
+        index = int(i - modwave[i])
+        if index >= 0 and index < len(data):
+            out[i] = data[i] * dry + data[index] * wet
+    return out
+
+
+def feedback_modulated_delay_loop(data, modwave, dry, wet):
+    ''' Reference per-sample loop, as effect.feedback_modulated_delay used to
+        be implemented.
+    '''
+    out = data.copy()
+    for i in range(len(data)):
+        index = int(i - modwave[i])
+        if index >= 0 and index < len(data):
+            out[i] = out[i] * dry + out[index] * wet
+    return out
+
+
+def lfo(data, freq, depth, delay, rate=44100):
+    mil = float(rate) / 1000
+    t = numpy.arange(len(data)) / float(rate)
+    return (numpy.sin(freq * 2 * numpy.pi * t) / 2 + 0.5) * depth * mil + delay * mil
+
+
+def bench(name, loop, vectorized, *args):
+    expected = loop(*args)
+    assert numpy.allclose(expected, vectorized(*args)), name
+    slow = min(timeit.repeat(lambda: loop(*args), number=1, repeat=3))
+    fast = min(timeit.repeat(lambda: vectorized(*args), number=1, repeat=3))
+    print('%-26s loop %.3fs  vectorized %.4fs  speedup %.1fx' % (
+        name, slow, fast, slow / fast))
+
+
+if __name__ == '__main__':
+    data = source.pluck(196.0, 5.0, seed=0)
+    chorus_wave = lfo(data, 3.14159, 1.0, 25.0)
+    flanger_wave = lfo(data, 0.5, 20.0, 1.0)
+    bench('modulated_delay', modulated_delay_loop,
+          lambda *args: effect.modulated_delay(*args, interpolate=False),
+          data, chorus_wave, 0.5, 0.5)
+    bench('feedback_modulated_delay', feedback_modulated_delay_loop,
+          effect.feedback_modulated_delay, data, flanger_wave, 0.5, 0.5)
+    bench('feedback (chorus delay)', feedback_modulated_delay_loop,
+          effect.feedback_modulated_delay, data, chorus_wave, 0.5, 0.5)
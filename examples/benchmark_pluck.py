@@ -0,0 +1,97 @@
+import timeit
+
+import numpy
+
+from musical.audio import source
+from musical.audio.timeline import Hit
+from musical.theory import Note
+
+
+def ringbuffer_loop(data, length, decay=1.0, rate=44100):
+    ''' Reference per-sample Karplus-Strong loop, as source.ringbuffer used
+        to be implemented.
+    '''
+    phase = len(data)
+    length = int(rate * length)
+    out = numpy.resize(data, length)
+    for i in range(phase, length):
+        index = i - phase
+        out[i] = (out[index] + out[index + 1]) * 0.5 * decay
+    return out
+
+
+def check(freq, length, decay=0.998, rate=44100):
+    phase = int(rate / float(freq))
+    data = numpy.random.random(phase) * 2 - 1
+    expected = ringbuffer_loop(data, length, decay, rate)
+    actual = source.ringbuffer(data, length, decay, rate)
+    assert numpy.allclose(expected, actual), freq
+    return data
+
+
+if __name__ == '__main__':
+    for freq in (30.0, 98.0, 196.0, 440.0, 1174.66, 1400.0, 2093.0, 5000.0,
+                 22050.0, 44100.0):
+        check(freq, 1.0)
+        check(freq, 0.01)
+
+    # Banjo range: fourth string open (D3) up to the first string at fret
+    # 22 (C7)
+    speedups = []
+    for freq in (146.83, 196.0, 587.33, 880.0, 1046.5, 1174.66, 1396.91,
+                 2093.0):
+        data = check(freq, 1.0)
+        loop = min(timeit.repeat(
+            lambda: ringbuffer_loop(data, 1.0, 0.998), number=1, repeat=3))
+        block = min(timeit.repeat(
+            lambda: source.ringbuffer(data, 1.0, 0.998), number=5, repeat=3)) / 5
+        # First render of a pitch, before its period matrix is cached
+        cold = min(timeit.repeat(
+            lambda: (source._ringbuffer_powers.cache_clear(),
+                     source.ringbuffer(data, 1.0, 0.998)),
+            number=5, repeat=3)) / 5
+        speedups.append(loop / cold)
+        print('%8.2f Hz: loop %.4fs  block %.6fs (%.6fs cold)  '
+              'speedup %.1fx (%.1fx cold)' % (
+                  freq, loop, block, cold, loop / block, loop / cold))
+    print('minimum speedup %.1fx' % min(speedups))
+
+    # 32 notes of 1 second each, as Hit.render_many would batch them: a
+    # forward roll over an open G chord (D4, G4, B4, D5 and the G5 drone) and
+    # the same roll played high up the neck, where notes repeat at short
+    # periods and are synthesized together
+    rolls = {
+        'open G roll': [146.83, 196.0, 246.94, 293.66, 392.0, 293.66,
+                        246.94, 392.0] * 4,
+        'high roll': [1174.66, 1396.91, 2093.0, 1567.98] * 8,
+    }
+    for name, freqs in rolls.items():
+        seeds = list(range(len(freqs)))
+        for expected, actual in zip(
+                [source.pluck(freq, 1.0, seed=seed)
+                 for freq, seed in zip(freqs, seeds)],
+                source.pluck_many(freqs, 1.0, seeds=seeds)):
+            assert numpy.allclose(expected, actual)
+        single = min(timeit.repeat(
+            lambda: [source.pluck(freq, 1.0, seed=seed)
+                     for freq, seed in zip(freqs, seeds)],
+            number=3, repeat=3)) / 3
+        batch = min(timeit.repeat(
+            lambda: source.pluck_many(freqs, 1.0, seeds=seeds),
+            number=3, repeat=3)) / 3
+        print('%s, %d notes: pluck %.4fs  pluck_many %.4fs  speedup %.1fx' % (
+            name, len(freqs), single, batch, single / batch))
+
+    # An uncached Hit.render must cost no more than the pluck it wraps
+    note = Note('a4')
+    hit = Hit(note, 1.0, seed=1)
+    assert numpy.array_equal(hit.render(), source.pluck(note, 1.0, seed=1))
+
+    def render():
+        Hit.cache.clear()
+        return hit.render()
+    single = min(timeit.repeat(lambda: source.pluck(note, 1.0, seed=1),
+                               number=20, repeat=5)) / 20
+    rendered = min(timeit.repeat(render, number=20, repeat=5)) / 20
+    print('Hit.render %.6fs  pluck %.6fs  ratio %.2f' % (
+        rendered, single, rendered / single))
@@ -44,6 +44,8 @@ def create_app(test_config=None):
   from bl import banjo
   from bl import note
 
+  banjo.init_app(app)
+
   app.register_blueprint(auth.bp)
   app.register_blueprint(blog.bp)
   app.register_blueprint(rolls.bp)
@@ -1,3 +1,15 @@
+import functools
+import json
+import os
+import tempfile
+
+import click
+import numpy
+from musical.theory import Fretboard
+from musical.theory import NoteArray
+from musical.theory import identify
+from musical.theory.chord import NAMED_CHORDS
+
 from bl.note import Note
 
 ROLL_DICT = {
@@ -15,10 +27,114 @@ BANJO_TUNING = {
   5: Note('g5')
 }
 
+# Common banjo tunings as open string notes, first string first
+TUNINGS = {
+  'open_g': ('d5', 'b4', 'g4', 'd4', 'g5'),
+  'open_d': ('d5', 'a4', 'f#4', 'd4', 'a5'),
+  'double_c': ('d5', 'c5', 'g4', 'c4', 'g5'),
+  'sawmill': ('d5', 'c5', 'g4', 'd4', 'g5'),
+}
+
+# Number of tunings whose fretboard and chord table are kept in memory
+TUNING_CACHE_SIZE = 32
+
+# Picking fingers in roll patterns: Thumb, Index and Middle
+FINGERS = 'TIM'
+
+# One note of a prototab: string number (1 = first string), fret, start and
+# duration in ticks (a sixteenth note is 2 ticks) and finger (index into
+# FINGERS, NO_FINGER when unknown)
+PROTOTAB_DTYPE = numpy.dtype([
+  ('string', numpy.uint8),
+  ('fret', numpy.int16),
+  ('start', numpy.int32),
+  ('duration', numpy.int32),
+  ('finger', numpy.int8),
+])
+NO_FINGER = -1
+
+# Number of compiled roll patterns kept in memory
+ROLL_CACHE_SIZE = 256
+
+# Serialized chord table, see load_chords. Regenerate with: flask generate-chords
+CHORDS_PATH = os.path.join(os.path.dirname(__file__), 'chords.json')
+
+# BANJO_TUNING as a NoteArray, first string first
+BANJO_TUNING_ARRAY = NoteArray([BANJO_TUNING[string] for string in sorted(BANJO_TUNING)])
+
+# Frets 0 (open) to 22
+NUM_FRETS = 23
+
+# Strings stopped by chord shapes, the fifth (drone) string is always open
+FRETTED_STRINGS = 4
+
+# Chord qualities generated for every tuning, see base_chord_shapes
+CHORD_QUALITIES = ('major', 'minor')
+
+# Chord shape voicings, named by the chord tone on the first string: the root,
+# the third or the fifth
+VOICINGS = ('alpha', 'beta', 'gamma')
+
+# Base chord shapes are searched among the first SHAPE_FRETS frets (open to 4)
+SHAPE_FRETS = 5
+
+# First shape of each chord class in BANJO_TUNING. Stored progressions use
+# the chord names of this table, so it is kept as written rather than derived
+# like the shapes of other tunings (see base_chord_shapes), even though
+# beta_major also sounds the ninth and beta_minor and gamma_minor sound G#m
+# and Cm.
+OPEN_G_SHAPES = {
+  'alpha_major': (2, 0, 1, 2, 0), # E
+  'beta_major':  (2, 1, 0, 0, 0), # C
+  'gamma_major': (0, 0, 0, 0, 0), # G
+  'alpha_minor': (2, 0, 0, 2, 0), # Em
+  'beta_minor':  (1, 0, 1, 1, 0), # Cm
+  'gamma_minor': (1, 1, 0, 1, 0), # G#m
+}
+
+
+def tuning_notes(tuning=None):
+  """
+  Normalize a tuning to a tuple of open string Notes, first string first.
+  Args:
+    tuning: None for BANJO_TUNING, a name from TUNINGS, a dictionary mapping
+      string numbers to Notes (like BANJO_TUNING) or a sequence of notes,
+      first string first.
+  Returns:
+    A tuple of Notes, usable as a cache key.
+  """
+  if tuning is None:
+    tuning = BANJO_TUNING
+  if isinstance(tuning, str):
+    if tuning not in TUNINGS:
+      raise ValueError(f"Unknown tuning {tuning}, expected one of {', '.join(TUNINGS)}")
+    tuning = TUNINGS[tuning]
+  if isinstance(tuning, dict):
+    tuning = [tuning[string] for string in sorted(tuning)]
+  return tuple(Note(note) for note in tuning)
+
 
-def fret_strings(chord):
+@functools.lru_cache(maxsize=TUNING_CACHE_SIZE)
+def _fretboard(notes):
+  return Fretboard(notes, NUM_FRETS)
+
+
+def get_fretboard(tuning=None):
+  """
+  Return the Fretboard (pitch of every string at every fret) of a tuning,
+  built once per tuning and shared by chord generation, the rolls view and
+  audio rendering.
   """
-  Fret strings pulls BANJO_TUNING from the global namespace and frets the strings
+  return _fretboard(tuning_notes(tuning))
+
+
+# Fretboard of BANJO_TUNING
+FRETBOARD = get_fretboard()
+
+
+def fret_strings(chord, tuning=None):
+  """
+  Fret strings looks up the strings of the tuning's fretboard fretted
   according to the supplied chord.
   chord: a tuple which maps the depressed fret to the banjo string, according to the schema:
     chord = (
@@ -30,16 +146,40 @@ def fret_strings(chord):
     )
   Args:
     chord: a tuple of depressed frets
+    tuning: see tuning_notes, defaults to BANJO_TUNING
   Returns:
     A dictionary of banjo strings mapped to the note after the chord has been applied.
   """
-  global BANJO_TUNING
-  fretted_strings = dict(BANJO_TUNING)
+  return {
+    banjo_string: Note(int(pitch))
+    for banjo_string, pitch in enumerate(get_fretboard(tuning).fret(chord), 1)
+  }
+
+
+def fret_strings_array(chord, tuning=None):
+  """
+  Vectorized fret_strings: fret all strings of the tuning's fretboard at once.
+  Args:
+    chord: a tuple (or array) of depressed frets, first string first, or an
+      array of such chords
+    tuning: see tuning_notes, defaults to BANJO_TUNING
+  Returns:
+    A NoteArray of the fretted strings, first string first.
+  """
+  return get_fretboard(tuning).notes(chord)
+
 
-  for str_idx, fret in enumerate(chord):
-    banjo_string = str_idx + 1
-    fretted_strings[banjo_string] = fretted_strings[banjo_string].transpose(fret)
-  return fretted_strings
+def roll_pitches(chord, roll, tuning=None):
+  """
+  Note indexes of a roll picked over a chord, in picking order.
+  Args:
+    chord: a tuple of depressed frets (or an array of chords)
+    roll: the string numbers picked in order, such as ROLL_DICT['square_roll']
+    tuning: see tuning_notes, defaults to BANJO_TUNING
+  Returns:
+    An integer array of note indexes, one row per chord for an array of chords.
+  """
+  return get_fretboard(tuning).roll(chord, roll)
 
 
 def generate_moveable_chords(first_chord, name): 
@@ -63,33 +203,65 @@ def generate_moveable_chords(first_chord, name):
     frets that are depressed to play the chord.
   """
 
-def generate_all_chords():
-  """ Given the first shape for each chord class, generate the full list of chords"""
-  first_alpha_major = (2, 0, 1, 2, 0) # E
-  first_beta_major  = (2, 1, 0, 0, 0) # C
-  first_gamma_major = (0, 0, 0, 0, 0) # G
-  first_alpha_minor = (2, 0, 0, 2, 0) # Em
-  first_beta_minor  = (1, 0, 1, 1, 0) # Cm
-  first_gamma_minor = (1, 1, 0, 1, 0) # G#m
-
-  # Create the arguments needed to generate a list of movable chords for each chord-type.
-  base_chords = [
-      {"base": first_alpha_major, "name": "alpha_major"},
-      {"base": first_beta_major , "name": "beta_major" },
-      {"base": first_gamma_major, "name": "gamma_major"},
-      {"base": first_alpha_minor, "name": "alpha_minor"},
-      {"base": first_beta_minor , "name": "beta_minor" },
-      {"base": first_gamma_minor, "name": "gamma_minor"},
-  ]
+def base_chord_shapes(tuning=None):
+  """
+  Return the first shape of each chord class in a tuning (see tuning_notes,
+  defaults to BANJO_TUNING). For BANJO_TUNING these are OPEN_G_SHAPES, other
+  tunings are searched from the pitches of their fretted strings. A chord
+  class is a voicing and a quality from CHORD_QUALITIES, such as alpha_major:
+  the first string plays the root in alpha shapes, the third in beta shapes
+  and the fifth in gamma shapes. The first shape of a class is the narrowest
+  grip within SHAPE_FRETS frets of the nut whose fretted strings sound exactly
+  the chord, the fifth string is left open.
+  Returns:
+    A dictionary mapping chord class names to fret tuples, classes without a
+    grip in the tuning are left out.
+  """
+  notes = tuning_notes(tuning)
+  if notes == tuning_notes():
+    return dict(OPEN_G_SHAPES)
+  return dict(_base_chord_shapes(notes))
+
+
+@functools.lru_cache(maxsize=TUNING_CACHE_SIZE)
+def _base_chord_shapes(notes):
+  fretboard = get_fretboard(notes)
+  grips = numpy.indices((SHAPE_FRETS,) * FRETTED_STRINGS).reshape(FRETTED_STRINGS, -1).T
+  # Grips starting at the nut, narrowest first, then lowest
+  grips = grips[grips.min(axis=1) == 0]
+  grips = grips[numpy.lexsort(grips.T[::-1].tolist() + [grips.sum(axis=1), grips.max(axis=1)])]
+  pitches = fretboard.pitches[numpy.arange(FRETTED_STRINGS), grips]
+  masks = numpy.bitwise_or.reduce(1 << (pitches % 12), axis=1)
+  shapes = {}
+  for grip, first, mask, label in zip(grips.tolist(), pitches[:, 0].tolist(), masks.tolist(),
+                                       identify.label_chords(masks)):
+    if label is None or label[1] not in CHORD_QUALITIES:
+      continue
+    intervals = NAMED_CHORDS[label[1]]
+    if identify.POPCOUNT[mask] != len(intervals):
+      continue # The chord is missing a note or has extra notes
+    voicing = VOICINGS[intervals.index((first - label[0].index) % 12)]
+    shapes.setdefault((voicing, label[1]), tuple(grip) + (0,) * (len(fretboard) - FRETTED_STRINGS))
+  return tuple((f'{voicing}_{quality}', shapes[voicing, quality])
+               for quality in CHORD_QUALITIES for voicing in VOICINGS
+               if (voicing, quality) in shapes)
+
+
+def generate_all_chords(tuning=None):
+  """
+  Given the first shape for each chord class (see base_chord_shapes),
+  generate the full list of chords in a tuning (see tuning_notes, defaults to
+  BANJO_TUNING).
+  """
   moveable_chords = {}
 
   # Generate the list of movable chords for each chord type.
-  for kwargs in base_chords:
-    moveable_chords.update(generate_moveable_chords(**kwargs))
+  for name, base in base_chord_shapes(tuning).items():
+    moveable_chords.update(generate_moveable_chords(base, name, tuning=tuning))
   return moveable_chords
 
 
-def generate_moveable_chords(base, name):
+def generate_moveable_chords(base, name, tuning=None):
   """
   Given the first location of moveable chords represented as a tuple:
     chord = (
@@ -99,59 +271,247 @@ def generate_moveable_chords(base, name):
       fourth string fret,
       fifth string fret
     )
-  
-  Generate all moveable chords on the banjo. Optionally, each chord can be transformed with a
-  chord transformer (but the base shapes could also just be specified hardcoded).
-  #TODO(mike): Do something with file_name
+
+  Generate all moveable chords on the banjo by sliding the shape up the neck.
   Args:
-    file_name: A string that contains the full path to the file to serialize the generated
-    chords.
+    base: the first shape of the chord class, see base_chord_shapes
+    name: the chord class, a voicing and a quality such as 'alpha_major'
+    tuning: see tuning_notes, defaults to BANJO_TUNING
   Returns:
-    A dictionary mapping the normalized Note name (representing the pitch of the chord) to the
-    frets that are depressed to play the chord.
+    A dictionary mapping the chord class and the normalized Note name of the
+    first string (the root of alpha shapes) to the frets that are depressed
+    to play the chord, such as 'alpha_major_g5'.
   """
+  voicing, quality = name.split('_', 1)
+  if voicing not in VOICINGS or quality not in CHORD_QUALITIES:
+    raise ValueError(f"{name} does not have a defined note-lookup")
+
   moveable_chords = {}
+  fretboard = get_fretboard(tuning)
 
-  for fret_position in range(0, 23):
-    # These are all tuples that map strings to fret positions:
-    # E.g. alpha = (
-    #          first string fret position,
-    #          second string fret position,
-    #          third string fret position,
-    #          fourth string fret position,
-    #          fifth string fret position,
-    #        )
-    # Add the fret offset to each base chord, and don't add an offset to the fifth string.
-    chord = tuple([banjo_string + fret_position if string_idx != 4 else banjo_string for string_idx, banjo_string in enumerate(base)])
-    fretted_strings = fret_strings(chord)
-
-    if name.startswith('alpha'):
-      chord_name_idx = 1
-    elif name.startswith('beta'):
-      chord_name_idx = 2
-    elif name.startswith('gamma'):
-      chord_name_idx = 3
-    else:
-      raise ValueError(f"{name} does not have a defined note-lookup")
+  for fret_position in range(0, NUM_FRETS):
+    # Add the fret offset to each fretted string, the fifth string stays open.
+    chord = tuple([fret + fret_position if string_idx < FRETTED_STRINGS else fret
+                   for string_idx, fret in enumerate(base)])
 
     # Make sure we're not playing frets that don't exist
-    if any([fret > 22 for fret in chord]) or any([fret < 0 for fret in chord]):
+    if any([fret >= NUM_FRETS for fret in chord]) or any([fret < 0 for fret in chord]):
       pass # Chord contains frets that are greater than 22 or less than 0.
     else:
-      moveable_chords[f'{name}_' + fretted_strings[1].get_note_name()] = chord
+      first_string = Note(int(fretboard.pitches[0, chord[0]]))
+      moveable_chords[f'{name}_' + first_string.get_note_name()] = chord
   return moveable_chords
 
 
+class RollPattern:
+  """
+  A roll pattern string such as 'T4I3M2' (Thumb on the fourth string, Index on
+  the third, Middle on the second) parsed and validated once. The picks are
+  stored as compact arrays, so the same pattern can be applied to many chords
+  without re-parsing:
+    fingers: index into FINGERS of the finger of every pick
+    strings: string number (1 = first string) of every pick
+    notes: PROTOTAB_DTYPE notes of the picks as sixteenth notes, frets unset
+  Use compile_roll to share compiled patterns between calls.
+  """
+
+  def __init__(self, source):
+    if len(source) % 2:
+      raise ValueError(f"Roll pattern {source!r} has an incomplete pick at the end")
+    fingers = []
+    strings = []
+    for i in range(0, len(source), 2):
+      finger, string = source[i], source[i + 1]
+      if finger not in FINGERS:
+        raise ValueError(f"Roll pattern {source!r} has unknown finger {finger!r} at {i}, "
+                         f"expected one of {', '.join(FINGERS)}")
+      if string not in '12345':
+        raise ValueError(f"Roll pattern {source!r} has unknown string {string!r} at {i + 1}, "
+                         "expected 1 to 5")
+      fingers.append(FINGERS.index(finger))
+      strings.append(int(string))
+    self.source = source
+    self.fingers = numpy.array(fingers, dtype=numpy.uint8)
+    self.strings = numpy.array(strings, dtype=numpy.uint8)
+    self.notes = Prototab.sequence(self.strings, 0, duration=2, fingers=self.fingers).notes
+
+  def __repr__(self):
+    return f"RollPattern({self.source!r})"
+
+  def __len__(self):
+    return len(self.strings)
+
+  def frets(self, chord):
+    """
+    Frets picked by the roll over a chord (a fret tuple, or an array of chords
+    for one row per chord), in picking order.
+    """
+    return numpy.asarray(chord)[..., self.strings.astype(numpy.intp) - 1]
+
+
+@functools.lru_cache(maxsize=ROLL_CACHE_SIZE)
+def compile_roll(source):
+  """
+  Return the RollPattern of a roll pattern string, cached by source string.
+  Raises ValueError for malformed patterns.
+  """
+  return RollPattern(source)
+
+
+class Prototab:
+  """
+  A sequence of notes to be rendered as tab, stored as a structured array of
+  PROTOTAB_DTYPE (one record per note, fields string, fret, start, duration
+  and finger). Fields are available as array attributes, and transforms work
+  on whole columns at once and return a new Prototab.
+  """
+
+  def __init__(self, notes=None):
+    """
+    Args:
+      notes: a structured array of PROTOTAB_DTYPE or a list of
+        (string, fret, start, duration, finger) tuples, empty if None.
+    """
+    if notes is None:
+      notes = numpy.empty(0, dtype=PROTOTAB_DTYPE)
+    self.notes = numpy.asarray(notes, dtype=PROTOTAB_DTYPE)
+
+  def __repr__(self):
+    return f"Prototab({self.to_dicts()!r})"
+
+  def __len__(self):
+    return len(self.notes)
+
+  def __getitem__(self, key):
+    return Prototab(numpy.atleast_1d(self.notes[key]))
+
+  def __eq__(self, other):
+    if not isinstance(other, Prototab):
+      return NotImplemented
+    return numpy.array_equal(self.notes, other.notes)
+
+  __hash__ = None
+
+  @property
+  def string(self):
+    return self.notes['string']
+
+  @property
+  def fret(self):
+    return self.notes['fret']
+
+  @property
+  def start(self):
+    return self.notes['start']
+
+  @property
+  def duration(self):
+    return self.notes['duration']
+
+  @property
+  def finger(self):
+    return self.notes['finger']
+
+  @property
+  def end(self):
+    """Tick at which the last note ends"""
+    return int((self.start + self.duration).max()) if len(self) else 0
+
+  @classmethod
+  def sequence(cls, strings, frets, duration=2, fingers=NO_FINGER, start=0):
+    """
+    Prototab of notes played one after another, each lasting duration ticks
+    (a number or one per note), the first starting at tick start.
+    """
+    notes = numpy.empty(len(strings), dtype=PROTOTAB_DTYPE)
+    notes['string'] = strings
+    notes['fret'] = frets
+    notes['duration'] = duration
+    notes['finger'] = fingers
+    notes['start'] = start
+    notes['start'][1:] += numpy.cumsum(notes['duration'][:-1])
+    return cls(notes)
+
+  @classmethod
+  def from_dicts(cls, proto_tab):
+    """
+    Prototab from the list of {'fret', 'time', 'string'} dicts form, notes
+    played one after another. An optional 'finger' is a letter of FINGERS.
+    """
+    return cls.sequence(
+        strings=[note['string'] for note in proto_tab],
+        frets=[note['fret'] for note in proto_tab],
+        duration=[note['time'] for note in proto_tab],
+        fingers=[FINGERS.index(note['finger']) if 'finger' in note else NO_FINGER
+                 for note in proto_tab])
+
+  def to_dicts(self):
+    """Prototab as the list of {'fret', 'time', 'string'} dicts form"""
+    return [
+        {
+            'fret': fret,
+            'time': duration,
+            'string': string
+        }
+        for fret, duration, string in zip(
+            self.fret.tolist(), self.duration.tolist(), self.string.tolist())
+    ]
+
+  @classmethod
+  def concatenate(cls, prototabs):
+    """Prototab of prototabs played one after another"""
+    notes = []
+    offset = 0
+    for prototab in prototabs:
+      notes.append(prototab.shift(offset).notes)
+      offset += prototab.end
+    if not notes:
+      return cls()
+    return cls(numpy.concatenate(notes))
+
+  def transpose(self, halfsteps, strings=(1, 2, 3, 4)):
+    """
+    Move the notes on strings (the fretted strings by default, leaving the
+    fifth string drone alone) halfsteps frets up or down, as chord shapes
+    move. A capo at fret n is transpose(n). Raises ValueError if a note would
+    leave the fretboard.
+    """
+    notes = self.notes.copy()
+    moved = numpy.isin(notes['string'], strings)
+    frets = notes['fret'] + numpy.where(moved, halfsteps, 0)
+    if ((frets < 0) | (frets >= NUM_FRETS)).any():
+      raise ValueError(f"Transposing by {halfsteps} moves notes off the fretboard")
+    notes['fret'] = frets
+    return Prototab(notes)
+
+  def shift(self, ticks):
+    """Start every note ticks later (earlier if negative)"""
+    notes = self.notes.copy()
+    notes['start'] += ticks
+    return Prototab(notes)
+
+  def stretch(self, factor):
+    """
+    Scale start and duration of every note by factor (2 halves the tempo),
+    rounding to whole ticks.
+    """
+    notes = self.notes.copy()
+    notes['start'] = numpy.rint(notes['start'] * factor)
+    notes['duration'] = numpy.maximum(numpy.rint(notes['duration'] * factor), 1)
+    return Prototab(notes)
+
+
 def roll_on_chord(roll_pattern, chord):
   """ Assume that a roll is 16h notes, an eight note roll
   repeated twice.
   Args:
     roll_pattern: a string such as T1I1M3 - this means Thumb on first string
-      index on first string, middle on third string.
+      index on first string, middle on third string, or a compiled RollPattern.
     chord: a tuple, such as alpha g5, e.g. (5, 3, 4, 5, 0) # fret
                                            (1, 2, 3, 4, 5) # string number
                                            (0, 1, 2, 3, 4) # tuple index
-  Returns A time sequenced list of notes and durations and frets
+  Returns A time sequenced Prototab of strings, frets, start ticks, durations
+    and fingers. Prototab.to_dicts gives the older list of dicts form:
     List[
       {
         'fret': 3 ,
@@ -160,70 +520,71 @@ def roll_on_chord(roll_pattern, chord):
       }
     ]
   """
-  string_index_lookup = {
-      '1': 0,
-      '2': 1,
-      '3': 2,
-      '4': 3,
-      '5': 4
-  }
-
-  # roll_pattern T4I3M2 -> T4 I3 M2
-  n = 2
-  roll = [roll_pattern[i:i+n] for i in range(0, len(roll_pattern), n)]
-
-  output = []
-
-  for finger in roll:  
-    string_number = finger[1]
-    string_idx = string_index_lookup[string_number]
+  if isinstance(roll_pattern, str):
+    roll_pattern = compile_roll(roll_pattern)
 
-    # Get the right fret
-    fret = chord[string_idx]
-
-    # append the string, duration, and fret to the output object. 
-    output.append(
-        {
-            'fret': fret,
-            'time': 2,
-            'string': int(string_number)
-        }
-    )
-  return output
+  notes = roll_pattern.notes.copy()
+  notes['fret'] = roll_pattern.frets(chord)
+  return Prototab(notes)
 
 def prototab_to_ascii(proto_tab):
-  """Takes prototab and returns ascii.
+  """Takes prototab (a Prototab or the list of dicts form) and returns ascii.
   
   Assume that no notes are played at the same time. Use the duration
   of each note to fill out each string in ascii with either a played
-  note or '-' characters. Grow the ascii from left to right.
+  note or '-' characters, and fill gaps between notes with '-'. Grow the
+  ascii from left to right.
   """
-                   #  1 ,    2,     3,     4,    5
-  ascii_strings = [  '|',   '|',   '|',   '|',  '|']
-  first_string = 0
-  second_string = 1
-  third_string = 2
-  fourth_string = 3
-  fifth_string = 4
-
-  # trinary operator
-  # value = option1 if condition true else option2
-
-  for note in proto_tab:
-    ascii_strings[first_string]  += str(note['fret']).ljust(note['time'], '-') if note['string'] == 1 else '-'.ljust(note['time'], '-')
-    ascii_strings[second_string] += str(note['fret']).ljust(note['time'], '-') if note['string'] == 2 else '-'.ljust(note['time'], '-')
-    ascii_strings[third_string]  += str(note['fret']).ljust(note['time'], '-') if note['string'] == 3 else '-'.ljust(note['time'], '-')
-    ascii_strings[fourth_string] += str(note['fret']).ljust(note['time'], '-') if note['string'] == 4 else '-'.ljust(note['time'], '-')
-    ascii_strings[fifth_string]  += str(note['fret']).ljust(note['time'], '-') if note['string'] == 5 else '-'.ljust(note['time'], '-')
+  if not isinstance(proto_tab, Prototab):
+    proto_tab = Prototab.from_dicts(proto_tab)
+  notes = proto_tab.notes[numpy.argsort(proto_tab.start, kind='stable')]
+  return _ascii_strings(*_ascii_cells(notes))
+
+
+def _ascii_cells(notes):
+  # String of every note, and every note as ascii on its own string (the
+  # fret number) and on the other strings ('-'), padded to its duration and
+  # preceded by the rest since the previous note. Notes are sorted by start.
+  ends = notes['start'] + notes['duration']
+  gaps = numpy.maximum(notes['start'] - numpy.concatenate(([0], ends[:-1])), 0)
+  played = []
+  silent = []
+  for fret, duration, gap in zip(notes['fret'].tolist(), notes['duration'].tolist(), gaps.tolist()):
+    played.append('-' * gap + str(fret).ljust(duration, '-'))
+    silent.append('-' * (gap + duration))
+  return notes['string'].tolist(), played, silent
+
+
+def _ascii_strings(strings, played, silent):
+  return [
+    '|' + ''.join([p if string == banjo_string else q
+                   for string, p, q in zip(strings, played, silent)])
+    for banjo_string in range(1, 6)
+  ]
 
-  return ascii_strings
 
 def roll_on_progression(progression, roll_pattern):
-  measures = []
-  for chord in progression:
-    prototab = roll_on_chord(roll_pattern=roll_pattern, chord=chord)
-    measures.append(prototab_to_ascii(prototab))
-  return measures
+  """
+  Roll a pattern over every chord of a progression and render one ascii
+  measure per chord. The whole progression is fretted and laid out as a
+  single prototab.
+  """
+  if isinstance(roll_pattern, str):
+    roll_pattern = compile_roll(roll_pattern)
+  picks = len(roll_pattern)
+  if not picks:
+    return [['|'] * 5 for chord in progression]
+  chords = numpy.array(progression, dtype=numpy.int64).reshape(-1, 5)
+  notes = numpy.tile(roll_pattern.notes, len(chords))
+  notes['fret'] = roll_pattern.frets(chords).ravel()
+  measure = Prototab(roll_pattern.notes).end
+  notes['start'] += numpy.repeat(numpy.arange(len(chords)) * measure, picks)
+
+  strings, played, silent = _ascii_cells(notes)
+  return [
+    _ascii_strings(strings[i:i + picks], played[i:i + picks], silent[i:i + picks])
+    for i in range(0, len(notes), picks)
+  ]
 
 
 def render_ascii_measures(measures):
@@ -240,9 +601,184 @@ def render_ascii_measures(measures):
 
   return '\n'.join(lines)
 
-CHORDS = generate_all_chords()
+def save_chords(path=CHORDS_PATH):
+  """
+  Generate the chord table and serialize it, together with the tuning it was
+  generated for, to a JSON file at path. The file is replaced atomically.
+  Returns:
+    The generated chord table.
+  """
+  chords = generate_all_chords()
+  data = {
+    'tuning': _tuning_names(),
+    'chords': {name: list(frets) for name, frets in sorted(chords.items())},
+  }
+  fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+  try:
+    with os.fdopen(fd, 'w') as f:
+      json.dump(data, f, separators=(',', ':'))
+      f.write('\n')
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+  except BaseException:
+    os.unlink(tmp)
+    raise
+  return chords
+
+
+def load_chords(path=CHORDS_PATH):
+  """
+  Load the chord table from the JSON file written by save_chords. If the file
+  is missing, unreadable or was generated for another tuning, the table is
+  regenerated (and written back if the location is writable).
+  Returns:
+    A dictionary mapping chord names such as 'alpha_major_g5' to fret tuples.
+  """
+  try:
+    with open(path) as f:
+      data = json.load(f)
+  except (OSError, ValueError):
+    data = None
+  if data is None or data.get('tuning') != _tuning_names():
+    try:
+      return save_chords(path)
+    except OSError:
+      return generate_all_chords()
+  return {name: tuple(frets) for name, frets in data['chords'].items()}
+
+
+@functools.lru_cache(maxsize=TUNING_CACHE_SIZE)
+def _chords(notes):
+  if notes == tuning_notes():
+    return load_chords()
+  return generate_all_chords(notes)
+
+
+def get_chords(tuning=None):
+  """
+  Return the chord table of a tuning (see tuning_notes), generated on first
+  use and kept for the TUNING_CACHE_SIZE most recently used tunings. The
+  table of BANJO_TUNING is loaded from CHORDS_PATH and is also available as
+  the module attribute CHORDS. Tables are shared, do not modify them.
+  """
+  return _chords(tuning_notes(tuning))
+
+
+class ChordIndex:
+  """
+  Reverse indexes of a chord table, built once with the table. Each maps a key
+  to the tuple of chord names it matches, so resolving a chord is a dictionary
+  lookup instead of a scan re-fretting every entry:
+    by_root: root pitch class (0 = C) -> names
+    by_quality: chord quality ('major', 'minor', ...) -> names
+    by_chord: (root pitch class, quality) -> names
+    by_pitch_classes: 12 bit pitch class mask of all sounding strings -> names
+    by_frets: fret tuple -> names
+  Root and quality are identified from the pitches of the fretted strings, so
+  they describe what a shape sounds like in the tuning rather than its name.
+  """
+
+  def __init__(self, chords, tuning=None):
+    self.chords = chords
+    fretboard = get_fretboard(tuning)
+    names = list(chords)
+    frets = numpy.array([chords[name] for name in names], dtype=numpy.int64)
+    frets = frets.reshape(-1, len(fretboard))
+    pitch_classes = 1 << (fretboard.fret(frets) % 12)
+    masks = numpy.bitwise_or.reduce(pitch_classes, axis=1)
+    fretted = numpy.bitwise_or.reduce(pitch_classes[:, :FRETTED_STRINGS], axis=1)
+    labels = identify.label_chords(fretted)
+
+    self.by_root = {}
+    self.by_quality = {}
+    self.by_chord = {}
+    self.by_pitch_classes = {}
+    self.by_frets = {}
+    for name, mask, label in zip(names, masks.tolist(), labels):
+      self.by_pitch_classes.setdefault(mask, []).append(name)
+      self.by_frets.setdefault(tuple(chords[name]), []).append(name)
+      if label is not None:
+        root, quality = label[0].index, label[1]
+        self.by_root.setdefault(root, []).append(name)
+        self.by_quality.setdefault(quality, []).append(name)
+        self.by_chord.setdefault((root, quality), []).append(name)
+    for index in (self.by_root, self.by_quality, self.by_chord,
+                  self.by_pitch_classes, self.by_frets):
+      for key, matches in index.items():
+        index[key] = tuple(matches)
+
+  def root(self, note, quality=None):
+    """
+    Names of the chords rooted at note (a Note, note name or pitch class),
+    optionally only those of the given quality.
+    """
+    root = note % 12 if isinstance(note, int) else Note(note).index % 12
+    if quality is None:
+      return self.by_root.get(root, ())
+    return self.by_chord.get((root, quality), ())
+
+  def quality(self, quality):
+    """Names of the chords of a quality, such as 'major'."""
+    return self.by_quality.get(quality, ())
+
+  def pitch_classes(self, notes):
+    """
+    Names of the chords sounding exactly the pitch classes of notes (an
+    iterable of notes or a 12 bit pitch class mask), in any octave.
+    """
+    mask = notes if isinstance(notes, int) else identify.pitch_class_mask(notes)
+    return self.by_pitch_classes.get(mask, ())
+
+  def frets(self, chord):
+    """Names of the chords played with the fret tuple chord."""
+    return self.by_frets.get(tuple(chord), ())
+
+
+@functools.lru_cache(maxsize=TUNING_CACHE_SIZE)
+def _chord_index(notes):
+  return ChordIndex(_chords(notes), notes)
+
+
+def get_chord_index(tuning=None):
+  """
+  Return the ChordIndex of the chord table of a tuning (see tuning_notes),
+  cached alongside the table.
+  """
+  return _chord_index(tuning_notes(tuning))
+
+
+def _tuning_names():
+  return [note.get_note_name() for note in tuning_notes()]
+
+
+def __getattr__(name):
+  # CHORDS is loaded lazily, on first access instead of at import
+  if name == 'CHORDS':
+    return get_chords()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@click.command('generate-chords')
+def generate_chords_command():
+  """
+  Regenerate the serialized chord table after changing the chord shapes or
+  the tuning.
+
+  Call with: flask generate-chords
+  """
+  chords = save_chords()
+  _chords.cache_clear()
+  _chord_index.cache_clear()
+  click.echo(f"Wrote {len(chords)} chords to {CHORDS_PATH}")
+
+
+def init_app(app):
+  """Register the banjo commands with the app"""
+  app.cli.add_command(generate_chords_command)
+
 
 if __name__ == '__main__':
+  CHORDS = get_chords()
   measures = roll_on_progression(
       progression= [
         CHORDS['alpha_major_g5'],
@@ -250,7 +786,7 @@ if __name__ == '__main__':
         CHORDS['alpha_major_d6'],
         CHORDS['alpha_major_g5']
         ],
-      roll_pattern = 'T4I3M2T3I2M1T4I3M2T3I2M1T512T3M1'
+      roll_pattern = 'T4I3M2T3I2M1T4I3M2T3I2M1T5I2T3M1'
   )
   print(render_ascii_measures(measures))
 
@@ -15,7 +15,7 @@ bp = Blueprint("rolls", __name__)
 
 
 # Example progression: alpha_major_g5 alpha_major_c6 alpha_major_d6 alpha_major_g5
-# Example roll pattern: T4I3M2T3I2M1T4I3M2T3I2M1T512T3M1
+# Example roll pattern: T4I3M2T3I2M1T4I3M2T3I2M1T5I2T3M1
 
 @bp.route("/rolls", methods=("GET", "POST"))
 def rolls():
@@ -23,17 +23,24 @@ def rolls():
   if request.method == "POST":
     progression = request.form['progression']
     roll_pattern = request.form['roll']
+    tuning = request.form.get('tuning', 'open_g')
     error = None
+    try:
+      chords = banjo.get_chords(tuning)
+      roll_pattern = banjo.compile_roll(roll_pattern.strip())
+    except ValueError as e:
+      error = str(e)
+    else:
+      progression = [token.strip() for token in progression.split()]
+      unknown = [p for p in progression if p not in chords]
+      if unknown:
+        error = f"Unknown chord {unknown[0]} in tuning {tuning}"
     if error is not None:
       flash(error)
     else:
-      progression = [token.strip() for token in progression.split()]
-      roll_pattern = roll_pattern.strip()
-      print(f"Progression {progression}\nRoll: {roll_pattern}")
-
-      progression = [banjo.CHORDS[p] for p in progression] 
+      progression = [chords[p] for p in progression]
       measures = banjo.roll_on_progression(progression=progression, roll_pattern=roll_pattern)
       ascii_tab = banjo.render_ascii_measures(measures)
 
-      return render_template("music/rolls.html", ascii_tab=ascii_tab)
-  return render_template("music/rolls.html")
+      return render_template("music/rolls.html", ascii_tab=ascii_tab, tunings=banjo.TUNINGS)
+  return render_template("music/rolls.html", tunings=banjo.TUNINGS)
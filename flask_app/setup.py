@@ -9,5 +9,7 @@ setup(
     zip_safe=False,
     install_requires=[
         'flask',
+        'musical',
+        'numpy',
     ],
 )
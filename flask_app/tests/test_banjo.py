@@ -0,0 +1,112 @@
+import pytest
+
+from bl import banjo
+
+EXAMPLE_PROGRESSION = ['alpha_major_g5', 'alpha_major_c6', 'alpha_major_d6', 'alpha_major_g5']
+EXAMPLE_ROLL = 'T4I3M2T3I2M1T4I3M2T3I2M1T5I2T3M1'
+
+
+def test_roll_pattern():
+    roll = banjo.RollPattern('T4I3M2')
+    assert len(roll) == 3
+    assert roll.strings.tolist() == [4, 3, 2]
+    assert [banjo.FINGERS[finger] for finger in roll.fingers] == ['T', 'I', 'M']
+    assert roll.frets((5, 3, 4, 5, 0)).tolist() == [5, 4, 3]
+
+
+@pytest.mark.parametrize(('source', 'message'), (
+    ('T512', 'unknown finger'),
+    ('T6', 'unknown string'),
+    ('T4I', 'incomplete pick'),
+))
+def test_roll_pattern_validate(source, message):
+    with pytest.raises(ValueError, match=message):
+        banjo.RollPattern(source)
+
+
+def test_compile_roll_cached():
+    assert banjo.compile_roll(EXAMPLE_ROLL) is banjo.compile_roll(EXAMPLE_ROLL)
+
+
+def test_prototab_dicts_round_trip():
+    proto_tab = [
+        {'fret': 5, 'time': 2, 'string': 4},
+        {'fret': 4, 'time': 2, 'string': 3},
+        {'fret': 3, 'time': 4, 'string': 2},
+        {'fret': 0, 'time': 1, 'string': 5},
+    ]
+    prototab = banjo.Prototab.from_dicts(proto_tab)
+    assert prototab.to_dicts() == proto_tab
+    assert prototab.start.tolist() == [0, 2, 4, 8]
+    assert banjo.Prototab.from_dicts(prototab.to_dicts()) == prototab
+
+
+def test_roll_on_progression():
+    chords = banjo.get_chords()
+    measures = banjo.roll_on_progression(
+        progression=[chords[name] for name in EXAMPLE_PROGRESSION],
+        roll_pattern=EXAMPLE_ROLL)
+    assert banjo.render_ascii_measures(measures) == '\n'.join([
+        '|----------5-----------5-------5-|----------10----------10------10|'
+        '----------12----------12------12|----------5-----------5-------5-|',
+        '|----3---3-------3---3-----3-----|----8---8-------8---8-----8-----|'
+        '----10--10------10--10----10----|----3---3-------3---3-----3-----|',
+        '|--4---4-------4---4---------4---|--9---9-------9---9---------9---|'
+        '--11--11------11--11--------11--|--4---4-------4---4---------4---|',
+        '|5-----------5-------------------|10----------10------------------|'
+        '12----------12------------------|5-----------5-------------------|',
+        '|------------------------0-------|------------------------0-------|'
+        '------------------------0-------|------------------------0-------|',
+    ])
+
+
+def test_rolls(client):
+    assert client.get('/rolls').status_code == 200
+    response = client.post('/rolls', data={
+        'progression': ' '.join(EXAMPLE_PROGRESSION),
+        'roll': EXAMPLE_ROLL,
+        'tuning': 'open_g',
+    })
+    assert b'|5-----------5----' in response.data
+
+
+@pytest.mark.parametrize(('progression', 'roll', 'tuning', 'message'), (
+    (EXAMPLE_PROGRESSION, 'T512', 'open_g', b'unknown finger'),
+    (EXAMPLE_PROGRESSION, EXAMPLE_ROLL, 'open_q', b'Unknown tuning open_q'),
+    (['alpha_major_g5', 'gamma_major_c7'], EXAMPLE_ROLL, 'open_d',
+     b'Unknown chord gamma_major_c7 in tuning open_d'),
+    (['alpha_major_e5'], EXAMPLE_ROLL, 'double_c',
+     b'Unknown chord alpha_major_e5 in tuning double_c'),
+))
+def test_rolls_validate_input(client, progression, roll, tuning, message):
+    response = client.post('/rolls', data={
+        'progression': ' '.join(progression),
+        'roll': roll,
+        'tuning': tuning,
+    })
+    assert message in response.data
+
+
+@pytest.mark.parametrize('tuning', [tuning for tuning in banjo.TUNINGS if tuning != 'open_g'])
+def test_chords_sound_their_quality(tuning):
+    chords = banjo.generate_all_chords(tuning)
+    index = banjo.ChordIndex(chords, tuning)
+    assert len(chords) > 100
+    for name in chords:
+        voicing, quality, first_string = name.split('_')
+        assert name in index.quality(quality)
+        if voicing == 'alpha':
+            assert name in index.root(first_string, quality)
+
+
+def test_open_g_chords_stable():
+    chords = banjo.get_chords('open_g')
+    assert chords == banjo.generate_all_chords()
+    assert chords['beta_major_e5'] == (2, 1, 0, 0, 0)
+    assert chords['gamma_major_d5'] == (0, 0, 0, 0, 0)
+    assert chords['beta_minor_d#5'] == (1, 0, 1, 1, 0)
+
+
+def test_chords_depend_on_tuning():
+    assert banjo.get_chords('open_d') != banjo.get_chords('open_g')
+    assert banjo.get_chords('open_d')['alpha_major_d5'] == (0, 0, 0, 0, 0)
@@ -1,3 +1,12 @@
-from . import theory, audio
+from . import theory
 
-__version__ = '0.2.0'
\ No newline at end of file
+__version__ = '0.2.0'
+
+
+def __getattr__(name):
+    # musical.audio pulls in pygame, import it on first access so code only
+    # using musical.theory does not pay for it
+    if name == 'audio':
+        import importlib
+        return importlib.import_module('.audio', __name__)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -2,6 +2,9 @@ from . import source
 from . import effect
 from . import encode
 from . import save
+from .cache import DiskCache
+from .cache import RenderCache
 from .timeline import Hit
 from .timeline import Timeline
 from .playback import play
+from .playback import Player
@@ -0,0 +1,290 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy
+
+# Default memory budget of the rendered hit cache, in bytes
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Default size cap of an on-disk rendered hit cache, in bytes
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+# Writes between recounts of an on-disk cache shared with other processes
+DISK_RESCAN_WRITES = 64
+
+# Fraction of its size cap an on-disk cache is pruned down to once full
+DISK_PRUNE_RATIO = 0.9
+
+
+class RenderCache:
+
+    ''' Least recently used cache of rendered audio arrays, bounded by the
+        total number of bytes held rather than the number of entries. Keeps
+        per-process hit, miss and eviction counters so it is possible to see
+        whether caching helps. Supports the subset of the dict interface used
+        by Hit, so it can be swapped for a plain dict or another cache object.
+        Safe to share between threads. Stored arrays are made read-only
+    '''
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return 'RenderCache(max_bytes=%d)' % self.max_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        # Views keep their whole base array alive, store an owned copy so
+        # the byte budget reflects the memory actually held
+        if value.base is not None:
+            value = value.copy()
+        # Entries are shared by every later hit, make them read-only (as
+        # DiskCache entries are) so in-place processing cannot alter them
+        value.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            if value.nbytes > self.max_bytes:
+                return
+            self._entries[key] = value
+            self.nbytes += value.nbytes
+            self._evict()
+
+    def __delitem__(self, key):
+        with self._lock:
+            self.nbytes -= self._entries.pop(key).nbytes
+
+    def get(self, key, default=None):
+        ''' Return cached value for key (marking it as recently used) or
+            default, counting the lookup as a hit or miss
+        '''
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def clear(self):
+        ''' Drop all entries and reset the counters
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def resize(self, max_bytes):
+        ''' Change the byte budget, evicting least recently used entries
+            if the cache no longer fits
+        '''
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def stats(self):
+        ''' Return dict of cache counters and current size
+        '''
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'nbytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def _evict(self):
+        # Called with the lock held
+        while self.nbytes > self.max_bytes:
+            key, value = self._entries.popitem(last=False)
+            self.nbytes -= value.nbytes
+            self.evictions += 1
+
+
+class DiskCache:
+
+    ''' Content addressed cache of rendered audio arrays stored as .npy files
+        in a directory, shared by every process pointing at that directory.
+        Entries are opened memory-mapped and read-only, so cache hits do not
+        copy the waveform. Files are written atomically, and when the
+        directory grows past max_bytes the least recently used files are
+        pruned, down to DISK_PRUNE_RATIO of the cap. Supports the same get() / item assignment interface as
+        RenderCache, so it can be used as Hit.cache
+    '''
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        os.makedirs(path, exist_ok=True)
+        self.nbytes = sum(size for _, _, size in self._files())
+
+    def __repr__(self):
+        return 'DiskCache(%r, max_bytes=%d)' % (self.path, self.max_bytes)
+
+    def __len__(self):
+        return len(self._files())
+
+    def __contains__(self, key):
+        return os.path.exists(self.filename(key))
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        filename = self.filename(key)
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                numpy.save(fp, numpy.asarray(value))
+            os.replace(tmp, filename)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        # nbytes is a running estimate, other processes write to the same
+        # directory: recount the files on disk every DISK_RESCAN_WRITES
+        # writes, and before pruning. Pruning goes below the cap so the
+        # next writes do not each have to prune again
+        self.nbytes += os.path.getsize(filename)
+        self._writes += 1
+        if self._writes % DISK_RESCAN_WRITES == 0:
+            self.nbytes = sum(size for _, _, size in self._files())
+        if self.nbytes > self.max_bytes:
+            self.prune(int(self.max_bytes * DISK_PRUNE_RATIO))
+
+    def __delitem__(self, key):
+        filename = self.filename(key)
+        size = os.path.getsize(filename)
+        os.unlink(filename)
+        self.nbytes -= size
+
+    def filename(self, key):
+        ''' Return path of the .npy file holding key. Keys are tuples of
+            plain values (strings and numbers), addressed by the hash of
+            their repr
+        '''
+        digest = hashlib.sha1(repr(key).encode('utf8')).hexdigest()
+        return os.path.join(self.path, digest + '.npy')
+
+    def get(self, key, default=None):
+        ''' Return memory-mapped array for key, or default
+        '''
+        filename = self.filename(key)
+        try:
+            value = numpy.load(filename, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return default
+        # Mark as recently used for pruning
+        try:
+            os.utime(filename)
+        except FileNotFoundError:
+            pass  # Pruned concurrently, the open mapping stays valid
+        self.hits += 1
+        return value
+
+    def clear(self):
+        ''' Remove every cached file and reset the counters
+        '''
+        self.prune(0)
+        self.hits = 0
+        self.misses = 0
+
+    def resize(self, max_bytes):
+        ''' Change the size cap, pruning if the cache no longer fits
+        '''
+        self.max_bytes = int(max_bytes)
+        self.prune()
+
+    def prune(self, max_bytes=None):
+        ''' Delete least recently used files until the directory holds at
+            most max_bytes (defaults to the cache size cap). Returns the
+            number of files removed
+        '''
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        files = sorted(self._files())
+        self.nbytes = sum(size for _, _, size in files)
+        removed = 0
+        for _, filename, size in files:
+            if self.nbytes <= max_bytes:
+                break
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass  # Pruned concurrently by another process
+            self.nbytes -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        ''' Return dict of cache counters and current size
+        '''
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self),
+            'nbytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def _files(self):
+        # (last use time, path, size) of every cached file
+        files = []
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.npy'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, entry.path, stat.st_size))
+        return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Manage an on-disk rendered hit cache')
+    parser.add_argument('command', choices=['prune', 'clear', 'stats'])
+    parser.add_argument('path', help='cache directory')
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_DISK_BYTES,
+                        help='size cap to prune the cache down to')
+    args = parser.parse_args()
+
+    cache = DiskCache(args.path, args.max_bytes)
+    if args.command == 'prune':
+        print('Removed %d files' % cache.prune())
+    elif args.command == 'clear':
+        cache.clear()
+    print(cache.stats())
@@ -1,52 +1,97 @@
+import math
+
+import numpy
+
 from . import source
 
 # TODO: More effects. Distortion, echo, delay, reverb, phaser, pitch shift?
-# TODO: Better generalize chorus/flanger (they share a lot of code)
 
-def modulated_delay(data, modwave, dry, wet):
+
+def _as_samples(data):
+    ''' Return data as a floating point array, keeping float32 or float64
+        data as it is and converting anything else to the sample type
+    '''
+    data = numpy.asarray(data)
+    if data.dtype.kind != 'f':
+        data = data.astype(source.sample_dtype())
+    return data
+
+
+def modulated_delay(data, modwave, dry, wet, interpolate=True):
     ''' Use LFO "modwave" as a delay modulator (no feedback)
+        The delayed signal is read at fractional positions with linear
+        interpolation, pass interpolate=False to truncate the delay to whole
+        samples instead. Samples whose delayed position falls outside of data
+        are passed through unchanged.
     '''
-    out = data.copy()
-    for i in range(len(data)):
-        index = int(i - modwave[i])
-        if index >= 0 and index < len(data):
-            out[i] = data[i] * dry + data[index] * wet
-    return out
+    data = _as_samples(data)
+    size = len(data)
+    position = numpy.arange(size) - modwave[:size]
+    if interpolate:
+        valid = (position >= 0) & (position <= size - 1)
+        position = position.clip(0, max(size - 1, 0))
+        index = position.astype(int)
+        frac = position - index
+        following = numpy.minimum(index + 1, size - 1)
+        delayed = data[index] * (1 - frac) + data[following] * frac
+    else:
+        index = position.astype(int)
+        valid = (index >= 0) & (index < size)
+        delayed = data[index.clip(0, max(size - 1, 0))]
+    out = numpy.where(valid, data * dry + delayed * wet, data)
+    return out.astype(data.dtype, copy=False)
 
 
 def feedback_modulated_delay(data, modwave, dry, wet):
     ''' Use LFO "modwave" as a delay modulator (with feedback)
+        Every output sample reads an earlier output sample at least
+        min(modwave) samples back, so the output is computed in blocks of that
+        many samples at a time.
     '''
-    out = data.copy()
-    for i in range(len(data)):
-        index = int(i - modwave[i])
-        if index >= 0 and index < len(data):
-            out[i] = out[i] * dry + out[index] * wet
+    out = _as_samples(data).copy()
+    size = len(out)
+    index = (numpy.arange(size) - modwave[:size]).astype(int)
+    valid = (index >= 0) & (index < size)
+    # Samples without a valid delayed sample keep their value: they read
+    # themselves with weights of 1 and 0
+    index = numpy.where(valid, index, numpy.arange(size))
+    drys = numpy.where(valid, dry, 1.0)
+    wets = numpy.where(valid, wet, 0.0)
+    block = max(int(modwave[:size].min()), 1) if size else 1
+    for start in range(0, size, block):
+        stop = min(start + block, size)
+        out[start:stop] = (out[start:stop] * drys[start:stop] +
+                           out[index[start:stop]] * wets[start:stop])
     return out
 
 
+def modulated_effect(data, freq, dry, wet, depth, delay, feedback=False,
+                     rate=44100):
+    ''' Shared engine of chorus and flanger: delay data by a sine LFO of
+        'freq' Hz swinging between 'delay' and 'delay + depth' milliseconds,
+        with or without feedback
+    '''
+    mil = float(rate) / 1000
+    t = numpy.arange(len(data)) / float(rate)
+    lfo = numpy.sin(float(freq) * 2 * math.pi * t)
+    modwave = (lfo / 2 + 0.5) * (depth * mil) + delay * mil
+    if feedback:
+        return feedback_modulated_delay(data, modwave, dry, wet)
+    return modulated_delay(data, modwave, dry, wet)
+
+
 def chorus(data, freq, dry=0.5, wet=0.5, depth=1.0, delay=25.0, rate=44100):
     ''' Chorus effect
         http://en.wikipedia.org/wiki/Chorus_effect
     '''
-    length = float(len(data)) / rate
-    mil = float(rate) / 1000
-    delay *= mil
-    depth *= mil
-    modwave = (source.sine(freq, length) / 2 + 0.5) * depth + delay
-    return modulated_delay(data, modwave, dry, wet)
+    return modulated_effect(data, freq, dry, wet, depth, delay, False, rate)
 
 
 def flanger(data, freq, dry=0.5, wet=0.5, depth=20.0, delay=1.0, rate=44100):
     ''' Flanger effect
         http://en.wikipedia.org/wiki/Flanging
     '''
-    length = float(len(data)) / rate
-    mil = float(rate) / 1000
-    delay *= mil
-    depth *= mil
-    modwave = (source.sine(freq, length) / 2 + 0.5) * depth + delay
-    return feedback_modulated_delay(data, modwave, dry, wet)
+    return modulated_effect(data, freq, dry, wet, depth, delay, True, rate)
 
 
 def tremolo(data, freq, dry=0.5, wet=0.5, rate=44100):
@@ -57,3 +102,187 @@ def tremolo(data, freq, dry=0.5, wet=0.5, rate=44100):
     modwave = (source.sine(freq, length) / 2 + 0.5)
     return (data * dry) + ((data * modwave) * wet)
 
+
+
+class Effect:
+
+    ''' Base class of stateful effects processing audio one block at a time.
+        State such as the LFO phase and delay lines carries over from one
+        block to the next, so a stream of blocks sounds the same as the whole
+        array processed at once
+    '''
+
+    def process(self, block, out=None):
+        ''' Process block, writing into 'out' (which may be block itself) or
+            a new array, and return it
+        '''
+        raise NotImplementedError
+
+    def reset(self):
+        ''' Forget all state, as if no block had been processed yet
+        '''
+        raise NotImplementedError
+
+    def stream(self, blocks):
+        ''' Process an iterable of blocks (such as Timeline.render_stream())
+            in place, yielding each block once processed. Read-only blocks,
+            such as cached hits, are processed into a new array instead. The
+            result can be passed to save.save_wave or playback.play
+        '''
+        for block in blocks:
+            yield self.process(block, block if block.flags.writeable else None)
+
+
+class ModulatedDelay(Effect):
+
+    ''' Streaming version of modulated_effect: a delay line modulated by a
+        sine LFO, with or without feedback. Keeps the LFO position and the
+        last delay + depth milliseconds of signal between blocks
+    '''
+
+    def __init__(self, freq, dry, wet, depth, delay, feedback=False,
+                 interpolate=True, rate=44100):
+        mil = float(rate) / 1000
+        self.freq = float(freq)
+        self.dry = dry
+        self.wet = wet
+        self.depth = depth * mil
+        self.delay = delay * mil
+        self.feedback = feedback
+        self.interpolate = interpolate
+        self.rate = rate
+        self.history = int(math.ceil(self.delay + self.depth)) + 2
+        self.reset()
+
+    def reset(self):
+        self.position = 0
+        self._buffer = source.silence(self.history, 1)
+
+    def process(self, block, out=None):
+        size = len(block)
+        if out is None:
+            out = numpy.empty(size, dtype=block.dtype)
+        history = self.history
+        if len(self._buffer) < history + size:
+            buffer = source.silence(history + size, 1)
+            buffer[:history] = self._buffer[:history]
+            self._buffer = buffer
+        buffer = self._buffer
+        buffer[history:history + size] = block
+        current = self.position + numpy.arange(size)
+        t = current / float(self.rate)
+        lfo = numpy.sin(self.freq * 2 * math.pi * t)
+        modwave = (lfo / 2 + 0.5) * self.depth + self.delay
+        position = current - modwave
+        # Offset from a sample's position in the stream to the buffer
+        offset = history - self.position
+        if self.feedback:
+            index = position.astype(int)
+            valid = index >= 0
+            index = numpy.where(valid, index + offset, current + offset)
+            drys = numpy.where(valid, self.dry, 1.0)
+            wets = numpy.where(valid, self.wet, 0.0)
+            step = max(int(modwave.min()), 1) if size else 1
+            for start in range(0, size, step):
+                stop = min(start + step, size)
+                chunk = buffer[history + start:history + stop]
+                delayed = buffer[index[start:stop]] * wets[start:stop]
+                chunk[:] = chunk * drys[start:stop] + delayed
+            out[:] = buffer[history:history + size]
+        else:
+            if self.interpolate:
+                valid = position >= 0
+                position = position.clip(0)
+                index = position.astype(int)
+                frac = position - index
+            else:
+                index = position.astype(int)
+                valid = index >= 0
+                index = index.clip(0)
+                frac = numpy.zeros(size)
+            index += offset
+            following = numpy.minimum(index + 1, history + size - 1)
+            delayed = buffer[index] * (1 - frac) + buffer[following] * frac
+            signal = buffer[history:history + size]
+            out[:] = numpy.where(
+                valid, signal * self.dry + delayed * self.wet, signal)
+        # Keep the tail as history for the next block
+        buffer[:history] = buffer[size:size + history]
+        self.position += size
+        return out
+
+
+class Chorus(ModulatedDelay):
+
+    ''' Streaming chorus effect, see chorus
+    '''
+
+    def __init__(self, freq, dry=0.5, wet=0.5, depth=1.0, delay=25.0,
+                 rate=44100):
+        super().__init__(freq, dry, wet, depth, delay, False, True, rate)
+
+
+class Flanger(ModulatedDelay):
+
+    ''' Streaming flanger effect, see flanger
+    '''
+
+    def __init__(self, freq, dry=0.5, wet=0.5, depth=20.0, delay=1.0,
+                 rate=44100):
+        super().__init__(freq, dry, wet, depth, delay, True, False, rate)
+
+
+class Tremolo(Effect):
+
+    ''' Streaming tremolo effect, see tremolo
+    '''
+
+    def __init__(self, freq, dry=0.5, wet=0.5, rate=44100):
+        self.freq = float(freq)
+        self.dry = dry
+        self.wet = wet
+        self.rate = rate
+        self.reset()
+
+    def reset(self):
+        self.position = 0
+
+    def process(self, block, out=None):
+        size = len(block)
+        if out is None:
+            out = numpy.empty(size, dtype=block.dtype)
+        t = (self.position + numpy.arange(size)) / float(self.rate)
+        modwave = numpy.sin(self.freq * 2 * math.pi * t) / 2 + 0.5
+        wet = block * modwave
+        wet *= self.wet
+        numpy.multiply(block, self.dry, out=out)
+        out += wet
+        self.position += size
+        return out
+
+
+class EffectChain(Effect):
+
+    ''' Series of effects applied one after the other to each block. Every
+        effect works in place on the same output buffer, so no intermediate
+        full-size arrays are allocated
+    '''
+
+    def __init__(self, effects):
+        self.effects = list(effects)
+
+    def __repr__(self):
+        return 'EffectChain(%r)' % self.effects
+
+    def reset(self):
+        for effect in self.effects:
+            effect.reset()
+
+    def process(self, block, out=None):
+        if out is None:
+            out = numpy.array(block, dtype=source.sample_dtype())
+        elif out is not block:
+            out[:] = block
+        for effect in self.effects:
+            effect.process(out, out)
+        return out
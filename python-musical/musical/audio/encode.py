@@ -1,29 +1,79 @@
 import numpy
 
+# Encoders convert this many samples at a time through a small scratch
+# buffer, so no full-length temporary arrays are created
+CHUNK_SIZE = 65536
 
-def as_uint8(data):
+
+def _encode(data, out, dtype, scale, signed):
+    ''' Write data encoded as 'dtype' into 'out' (allocated if None):
+        signed: clip to [-1, 1] then scale
+        unsigned: shift [-1, 1] to [0, 1], clip then scale
+    '''
+    data = numpy.asarray(data)
+    if out is None:
+        out = numpy.empty(data.shape, dtype=dtype)
+    source = data.reshape(-1)
+    target = out.reshape(-1)
+    scratch = numpy.empty(min(len(source), CHUNK_SIZE), dtype=data.dtype)
+    for start in range(0, len(source), CHUNK_SIZE):
+        chunk = source[start:start + CHUNK_SIZE]
+        buf = scratch[:len(chunk)]
+        if signed:
+            numpy.clip(chunk, -1, 1, out=buf)
+        else:
+            numpy.divide(chunk, 2, out=buf)
+            buf += 0.5
+            numpy.clip(buf, 0, 1, out=buf)
+        buf *= scale
+        numpy.copyto(target[start:start + len(chunk)], buf, casting='unsafe')
+    return out
+
+
+def as_uint8(data, out=None):
     ''' Return data encoded as unsigned 8 bit integer
     '''
-    data = (data / 2 + 0.5).clip(0, 1)
-    return (data * 255).astype(numpy.uint8)
+    return _encode(data, out, numpy.uint8, 255, False)
 
 
-def as_int8(data):
+def as_int8(data, out=None):
     ''' Return data encoded as signed 8 bit integer
     '''
-    data = data.clip(-1, 1)
-    return (data * 127).astype(numpy.int8)
+    return _encode(data, out, numpy.int8, 127, True)
 
 
-def as_uint16(data):
+def as_uint16(data, out=None):
     ''' Return data encoded as unsigned 16 bit integer
     '''
-    data = (data / 2 + 0.5).clip(0, 1)
-    return (data * 65535).astype(numpy.uint16)
+    return _encode(data, out, numpy.uint16, 65535, False)
 
 
-def as_int16(data):
+def as_int16(data, out=None):
     ''' Return data encoded as signed 16 bit integer
     '''
-    data = data.clip(-1, 1)
-    return (data * 32767).astype(numpy.int16)
+    return _encode(data, out, numpy.int16, 32767, True)
+
+
+def as_int24(data, out=None):
+    ''' Return data encoded as signed 24 bit little endian integer, packed
+        into 3 bytes per sample (as an unsigned 8 bit array of shape
+        (samples, 3))
+    '''
+    data = numpy.asarray(data).reshape(-1)
+    if out is None:
+        out = numpy.empty((len(data), 3), dtype=numpy.uint8)
+    scratch = numpy.empty(min(len(data), CHUNK_SIZE), dtype='<i4')
+    for start in range(0, len(data), CHUNK_SIZE):
+        chunk = data[start:start + CHUNK_SIZE]
+        buf = _encode(chunk, scratch[:len(chunk)], '<i4', 8388607, True)
+        packed = buf.view(numpy.uint8).reshape(-1, 4)
+        out[start:start + len(chunk)] = packed[:, :3]
+    return out
+
+
+def as_float32(data, out=None):
+    ''' Return data encoded as 32 bit float, clipped to [-1, 1]
+    '''
+    if out is None:
+        out = numpy.empty(numpy.shape(data), dtype='<f4')
+    return numpy.clip(data, -1, 1, out=out)
@@ -1,14 +1,236 @@
+import threading
+import time
+
 from . import encode
-import pygame
+from . import save
+try:
+    import pygame
+except ImportError:  # Only needed for pygame sounds and playback
+    pygame = None
 import numpy
 
 
 def play(data, rate=44100):
-    ''' Send audio array to pygame for playback
+    ''' Send audio array to pygame for playback. 'data' can also be an
+        iterable of audio arrays, such as Timeline.render_stream(), in which
+        case each block is queued on the channel as the previous one plays
     '''
     pygame.mixer.init(rate, -16, 1, 1024)
-    sound = pygame.sndarray.make_sound(encode.as_int16(data))
-    length = sound.get_length()
-    sound.play()
-    pygame.time.wait(int(length * 1000))
+    if isinstance(data, numpy.ndarray):
+        sound = pygame.sndarray.make_sound(encode.as_int16(data))
+        length = sound.get_length()
+        sound.play()
+        pygame.time.wait(int(length * 1000))
+    else:
+        channel = None
+        for block in data:
+            sound = pygame.sndarray.make_sound(encode.as_int16(block))
+            if channel is None:
+                channel = sound.play()
+                continue
+            while channel.get_queue() is not None:
+                pygame.time.wait(1)
+            channel.queue(sound)
+        while channel is not None and channel.get_busy():
+            pygame.time.wait(10)
     pygame.mixer.quit()
+
+
+class PygameBackend:
+
+    ''' Player backend sending audio to the pygame mixer. The mixer is opened
+        once and kept open, and blocks are double buffered on one channel:
+        one block plays while the next one waits in the channel queue
+    '''
+
+    def __init__(self, rate=44100, buffer=1024):
+        self.rate = rate
+        self.buffer = buffer
+        self.channel = None
+
+    def open(self):
+        pygame.mixer.init(self.rate, -16, 1, self.buffer)
+
+    def close(self):
+        self.channel = None
+        pygame.mixer.quit()
+
+    def ready(self):
+        # Room for another block: nothing playing, or nothing queued
+        return (self.channel is None or not self.channel.get_busy() or
+                self.channel.get_queue() is None)
+
+    def write(self, block):
+        sound = pygame.sndarray.make_sound(encode.as_int16(block))
+        if self.channel is None or not self.channel.get_busy():
+            self.channel = sound.play()
+        else:
+            self.channel.queue(sound)
+
+    def busy(self):
+        return self.channel is not None and self.channel.get_busy()
+
+    def pause(self):
+        pygame.mixer.pause()
+
+    def resume(self):
+        pygame.mixer.unpause()
+
+    def stop(self):
+        if self.channel is not None:
+            self.channel.stop()
+
+
+class NullBackend:
+
+    ''' Player backend that discards audio, for running headless. Counts the
+        blocks and frames it was given
+    '''
+
+    def __init__(self, rate=44100):
+        self.rate = rate
+        self.blocks = 0
+        self.frames = 0
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def ready(self):
+        return True
+
+    def write(self, block):
+        self.blocks += 1
+        self.frames += len(block)
+
+    def busy(self):
+        return False
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class FileBackend(NullBackend):
+
+    ''' Player backend writing audio to a wave file with save.WaveWriter, for
+        running headless and checking what would have been played
+    '''
+
+    def __init__(self, path, rate=44100, format='int16'):
+        super().__init__(rate)
+        self.path = path
+        self.format = format
+        self.writer = None
+
+    def open(self):
+        self.writer = save.WaveWriter(self.path, self.rate, 1, self.format)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def write(self, block):
+        super().write(block)
+        self.writer.write(block)
+
+
+class Player:
+
+    ''' Persistent, non-blocking player. Keeps its backend (the pygame mixer
+        by default) open between clips, and plays iterables of blocks, such
+        as Timeline.render_stream(), from a background thread so start,
+        pause, resume and stop return immediately
+    '''
+
+    def __init__(self, rate=44100, backend=None):
+        self.rate = rate
+        self.backend = backend if backend is not None else PygameBackend(rate)
+        self.backend.open()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self, blocks):
+        ''' Start playing 'blocks' (an audio array or an iterable of audio
+            arrays), stopping whatever is currently playing
+        '''
+        self.stop()
+        if isinstance(blocks, numpy.ndarray):
+            blocks = [blocks]
+        self._stopped.clear()
+        self.resume()
+        self._thread = threading.Thread(
+            target=self._play, args=(iter(blocks),), daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        ''' Pause playback, keeping the position in the stream
+        '''
+        self._running.clear()
+        self.backend.pause()
+
+    def resume(self):
+        ''' Resume paused playback
+        '''
+        self._running.set()
+        self.backend.resume()
+
+    def stop(self):
+        ''' Stop playback and drop the rest of the stream
+        '''
+        self._stopped.set()
+        self._running.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.stop()
+
+    def playing(self):
+        ''' Return whether a stream is being played (or is paused)
+        '''
+        return self._thread is not None and self._thread.is_alive()
+
+    def paused(self):
+        return not self._running.is_set()
+
+    def wait(self):
+        ''' Block until the current stream has finished playing
+        '''
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        ''' Stop playback and close the backend
+        '''
+        self.stop()
+        self.backend.close()
+
+    def _play(self, blocks):
+        # Feed blocks to the backend whenever it has room for one
+        for block in blocks:
+            while not self._stopped.is_set():
+                self._running.wait()
+                if self.backend.ready():
+                    break
+                time.sleep(0.001)
+            if self._stopped.is_set():
+                return
+            self.backend.write(block)
+        while self.backend.busy() and not self._stopped.is_set():
+            time.sleep(0.01)
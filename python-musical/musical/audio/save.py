@@ -1,17 +1,125 @@
+import struct
+
+import numpy
+
 from . import encode
 
-# TODO: Support other formats and settings
+# Sample formats supported by WaveWriter:
+#   name: (wave format tag, bytes per sample, encoded dtype, encoder)
+WAVE_FORMATS = {
+    'int16': (1, 2, '<i2', encode.as_int16),
+    'int24': (1, 3, 'u1', encode.as_int24),
+    'float32': (3, 4, '<f4', encode.as_float32),
+}
+
+
+class WaveWriter:
+
+    ''' Incremental wave file writer. Audio is written block by block as it
+        is produced, so long renders are saved with constant memory. Blocks
+        are 1-D arrays for mono or (samples, channels) arrays for stereo.
+        Each block is encoded into a reused buffer and handed to the file as
+        a memoryview, without building an intermediate bytes object. The
+        RIFF sizes are filled in when the writer is closed. Supports 16 and
+        24 bit PCM and 32 bit float samples
+    '''
+
+    def __init__(self, path, rate=44100, channels=1, format='int16'):
+        if format not in WAVE_FORMATS:
+            raise ValueError('Unsupported wave format %r' % format)
+        self.rate = rate
+        self.channels = channels
+        self.format = format
+        self.frames = 0
+        self.tag, self.sampwidth, self.dtype, self.encoder = WAVE_FORMATS[format]
+        self._buffer = numpy.empty(0, dtype=numpy.uint8)
+        if isinstance(path, str):
+            self.fp = open(path, 'wb')
+            self.owned = True
+        else:
+            self.fp = path
+            self.owned = False
+        self.start = self.fp.tell()
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, block):
+        ''' Encode and append a block of audio
+        '''
+        block = numpy.asarray(block)
+        if block.ndim != (1 if self.channels == 1 else 2) or (
+                block.ndim == 2 and block.shape[1] != self.channels):
+            raise ValueError('Expected block of %d channel(s), got shape %s'
+                             % (self.channels, block.shape))
+        size = block.size * self.sampwidth
+        if len(self._buffer) < size:
+            self._buffer = numpy.empty(size, dtype=numpy.uint8)
+        encoded = self._buffer[:size].view(self.dtype)
+        if self.sampwidth == 3:
+            encoded = encoded.reshape(block.size, 3)
+        else:
+            encoded = encoded.reshape(block.shape)
+        self.encoder(block, out=encoded)
+        self.fp.write(memoryview(self._buffer[:size]))
+        self.frames += len(block)
+
+    def write_stream(self, blocks):
+        ''' Append every block of an iterable, such as Timeline.render_stream()
+        '''
+        for block in blocks:
+            self.write(block)
+
+    def close(self):
+        ''' Fill in the header sizes and close the file (if it was opened
+            by the writer)
+        '''
+        if self.fp is None:
+            return
+        data_size = self.frames * self.channels * self.sampwidth
+        if data_size % 2:
+            self.fp.write(b'\0')  # Chunks are padded to an even size
+        end = self.fp.tell()
+        self.fp.seek(self.start)
+        self._write_header(data_size)
+        self.fp.seek(end)
+        if self.owned:
+            self.fp.close()
+        self.fp = None
+
+    def _write_header(self, data_size=0):
+        block_align = self.channels * self.sampwidth
+        fmt = struct.pack(
+            '<HHIIHH', self.tag, self.channels, self.rate,
+            self.rate * block_align, block_align, self.sampwidth * 8)
+        chunks = b''
+        if self.tag != 1:
+            # Non-PCM formats have an extension size and a fact chunk
+            fmt += struct.pack('<H', 0)
+            chunks += b'fact' + struct.pack('<II', 4, self.frames)
+        chunks = b'fmt ' + struct.pack('<I', len(fmt)) + fmt + chunks
+        riff_size = 4 + len(chunks) + 8 + data_size + data_size % 2
+        self.fp.write(b'RIFF' + struct.pack('<I', riff_size) + b'WAVE')
+        self.fp.write(chunks)
+        self.fp.write(b'data' + struct.pack('<I', data_size))
 
 
-def save_wave(data, path, rate=44100):
-    ''' Save audio data to wave file, currently only 16bit
+def save_wave(data, path, rate=44100, format='int16'):
+    ''' Save audio data to wave file as 'int16', 'int24' or 'float32'
+        samples. 'data' is either an audio array or an iterable of audio
+        arrays, such as Timeline.render_stream(), which are encoded and
+        written one at a time. 2-D (samples, channels) arrays are saved as
+        multi-channel audio
     '''
-    import wave
-    fp = wave.open(path, 'w')
-    fp.setnchannels(1)
-    fp.setframerate(rate)
-    fp.setsampwidth(2)
-    fp.setnframes(len(data))
-    data = encode.as_int16(data)
-    fp.writeframes(data.tostring())
-    fp.close()
+    if isinstance(data, numpy.ndarray):
+        data = [data]
+    data = iter(data)
+    first = next(data, numpy.zeros(0))
+    channels = 1 if first.ndim == 1 else first.shape[1]
+    with WaveWriter(path, rate, channels, format) as writer:
+        writer.write(first)
+        writer.write_stream(data)
@@ -1,50 +1,160 @@
+import functools
 import math
+import os
+import struct
+
 import numpy
-import pygame
+try:
+    import pygame
+except ImportError:  # Only needed for pygame sounds and playback
+    pygame = None
+
+# Target block size (in samples) and maximum number of periods unrolled per
+# block when evaluating the ringbuffer recurrence
+RINGBUFFER_BLOCK = 1024
+RINGBUFFER_MAX_ORDER = 8
+
+# Periods up to this many samples (pitches above about 920 Hz at 44.1 kHz)
+# are evaluated a block of whole periods at a time with a matrix product,
+# where the convolution blocks would be too short to be efficient
+RINGBUFFER_ROWS_MAX_PHASE = 48
+
+# Sample type of generated audio. Sources, effects, Timeline and the encoders
+# produce arrays of this type unless told otherwise, see set_sample_dtype
+SAMPLE_DTYPE = numpy.dtype(numpy.float64)
+
+
+def set_sample_dtype(dtype):
+    ''' Set the sample type of generated audio, numpy.float64 (the default)
+        or numpy.float32, which halves memory use and bandwidth
+    '''
+    global SAMPLE_DTYPE
+    dtype = numpy.dtype(dtype)
+    if dtype.kind != 'f':
+        raise ValueError('Sample type must be floating point, got %s' % dtype)
+    SAMPLE_DTYPE = dtype
+
+
+def sample_dtype(dtype=None):
+    ''' Return 'dtype' as a numpy dtype, or the configured SAMPLE_DTYPE if
+        it is None
+    '''
+    return SAMPLE_DTYPE if dtype is None else numpy.dtype(dtype)
+
 
-def silence(length, rate=44100):
+def silence(length, rate=44100, dtype=None):
     ''' Generate 'length' seconds of silence at 'rate'
     '''
-    return numpy.zeros(int(length * rate))
+    return numpy.zeros(int(length * rate), dtype=sample_dtype(dtype))
 
 
-def pygamesound(sound):
-    ''' Create numpy array from pygame sound object
-        rate is determined by pygame.mixer settings
+def _normalize(samples, bits, signed, mono, dtype):
+    ''' Convert integer 'samples' of 'bits' bits, of shape (samples,) or
+        (samples, channels), to floats in [-1, 1], summing the channels if
+        'mono'. Float samples are passed through, as a view when possible
     '''
-    pygame.sndarray.use_arraytype('numpy')
-    array = pygame.sndarray.array(sound)
-    rate, format, channels = pygame.mixer.get_init()
-    data = numpy.zeros(len(array))
-    for i, sample in enumerate(array):
-        data[i] = sum(sample)
-    if format < 0:
-        data /= (2 ** -format) / 2
+    dtype = sample_dtype(dtype)
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    if mono and channels > 1:
+        data = samples.sum(axis=1, dtype=dtype)
     else:
-        data = (data / (2 ** format)) * 2 - 1
+        data = samples.astype(dtype, copy=False)
+    if samples.dtype.kind == 'f':
+        return data
+    if signed:
+        data /= 2 ** (bits - 1)
+    else:
+        data /= 2 ** (bits - 1)
+        data -= channels if mono else 1
     return data
 
 
-def generate_wave_input(freq, length, rate=44100, phase=0.0):
+def pygamesound(sound, dtype=None):
+    ''' Create numpy array from pygame sound object, summing the channels of
+        stereo sounds. rate is determined by pygame.mixer settings
+    '''
+    rate, format, channels = pygame.mixer.get_init()
+    samples = pygame.sndarray.samples(sound)
+    return _normalize(samples, abs(format), format < 0 or format == 32,
+                      True, dtype)
+
+
+def wavefile(path, mono=True, dtype=None):
+    ''' Load a wave file without pygame, returning (data, rate). Supports
+        8, 16, 24 and 32 bit PCM and 32 or 64 bit float files. Channels are
+        summed if 'mono', otherwise data has shape (samples, channels)
+    '''
+    with open(path, 'rb') as fp:
+        riff, size, wave_id = struct.unpack('<4sI4s', fp.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError('%s is not a wave file' % path)
+        fmt = None
+        while True:
+            header = fp.read(8)
+            if len(header) < 8:
+                raise ValueError('%s has no data chunk' % path)
+            chunk, size = struct.unpack('<4sI', header)
+            if chunk == b'fmt ':
+                body = fp.read(size + size % 2)
+                fmt = struct.unpack('<HHIIHH', body[:16])
+                if fmt[0] == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE
+                    fmt = struct.unpack('<H', body[24:26]) + fmt[1:]
+            elif chunk == b'data':
+                offset = fp.tell()
+                break
+            else:
+                fp.seek(size + size % 2, 1)
+    if fmt is None:
+        raise ValueError('%s has no fmt chunk' % path)
+    tag, channels, rate, _, align, bits = fmt
+    size = min(size, os.path.getsize(path) - offset)
+    raw = numpy.fromfile(path, dtype=numpy.uint8,
+                         count=size - size % align, offset=offset)
+    if tag == 3:
+        samples = raw.view('<f%d' % (bits // 8))
+    elif tag != 1:
+        raise ValueError('Unsupported wave format %d' % tag)
+    elif bits == 8:
+        samples = raw
+    elif bits == 24:
+        raw = raw.reshape(-1, 3)
+        samples = (raw[:, 0].astype('<i4') | raw[:, 1].astype('<i4') << 8 |
+                   raw[:, 2].view(numpy.int8).astype('<i4') << 16)
+    else:
+        samples = raw.view('<i%d' % (bits // 8))
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    return _normalize(samples, bits, bits != 8, mono, dtype), rate
+
+
+def generate_wave_input(freq, length, rate=44100, phase=0.0, dtype=None):
     ''' Used by waveform generators to create frequency-scaled input array
 
         Courtesy of threepineapples:
           https://code.google.com/p/python-musical/issues/detail?id=2
+
+        The angle is computed in double precision. For narrower sample types
+        it is wrapped to one period before converting, so the phase stays
+        accurate for long waves.
     '''
+    dtype = sample_dtype(dtype)
     length = int(length * rate)
     t = numpy.arange(length) / float(rate)
     omega = float(freq) * 2 * math.pi
     phase *= 2 * math.pi  
-    return omega * t + phase
+    data = omega * t + phase
+    if dtype != numpy.float64:
+        data = numpy.mod(data, 2 * math.pi, out=data).astype(dtype)
+    return data
 
 
-def sine(freq, length, rate=44100, phase=0.0):
+def sine(freq, length, rate=44100, phase=0.0, dtype=None):
     ''' Generate sine wave for frequency of 'length' seconds long
         at a rate of 'rate'. The 'phase' of the wave is the percent (0.0 to 1.0)
         into the wave that it starts on.
     '''
-    data = generate_wave_input(freq, length, rate, phase)
-    return numpy.sin(data)
+    data = generate_wave_input(freq, length, rate, phase, dtype)
+    return numpy.sin(data, out=data)
 
 
 def _sawtooth(t):
@@ -54,19 +164,19 @@ def _sawtooth(t):
     return (tmod / numpy.pi) - 1
 
 
-def sawtooth(freq, length, rate=44100, phase=0.0):
+def sawtooth(freq, length, rate=44100, phase=0.0, dtype=None):
     ''' Generate sawtooth wave for frequency of 'length' seconds long
         at a rate of 'rate'. The 'phase' of the wave is the percent (0.0 to 1.0)
         into the wave that it starts on.
     '''
-    data = generate_wave_input(freq, length, rate, phase)
+    data = generate_wave_input(freq, length, rate, phase, dtype)
     return _sawtooth(data)
 
 
 def _square(t, duty=0.5):
     ''' Generate square wave from wave input array with specific 'duty'.
     '''
-    y = numpy.zeros(t.shape)
+    y = numpy.zeros(t.shape, dtype=t.dtype)
     tmod = numpy.mod(t, 2 * numpy.pi)
     mask = tmod < duty * 2 * numpy.pi
     numpy.place(y, mask, 1)
@@ -74,33 +184,170 @@ def _square(t, duty=0.5):
     return y
 
 
-def square(freq, length, rate=44100, phase=0.0):
+def square(freq, length, rate=44100, phase=0.0, dtype=None):
     ''' Generate square wave for frequency of 'length' seconds long
         at a rate of 'rate'. The 'phase' of the wave is the percent (0.0 to 1.0)
         into the wave that it starts on.
     '''
-    data = generate_wave_input(freq, length, rate, phase)
+    data = generate_wave_input(freq, length, rate, phase, dtype)
     return _square(data)
 
 
+def _ringbuffer_blocks(out, start, stop, phase, order, gain):
+    ''' Fill out[start:stop] in place with the ring buffer recurrence
+        out[i] = (out[i - phase] + out[i - phase + 1]) * gain, unrolled
+        'order' periods back. Unrolling k periods gives a binomial filter over
+        out[i - k * phase:i - k * phase + k + 1], which only reads samples from
+        before the current block as long as blocks are at most
+        k * (phase - 1) samples long, so each block is a single convolution.
+        Requires start >= order * phase.
+    '''
+    kernel = numpy.array([math.comb(order, j) for j in range(order + 1)],
+                         dtype=float) * gain ** order
+    kernel = kernel.astype(out.dtype)
+    block = max(order * (phase - 1), 1)
+    for begin in range(start, stop, block):
+        end = min(begin + block, stop)
+        index = begin - order * phase
+        window = out[index:index + (end - begin) + order]
+        out[begin:end] = numpy.convolve(window, kernel, 'valid')
+
+
+@functools.lru_cache(maxsize=32)
+def _ringbuffer_powers(phase, gain, rows, dtype):
+    ''' Return the (phase, rows * phase) matrix mapping one period of the
+        ring buffer to the next 'rows' periods. Period r + 1 is T @ period r,
+        where T averages neighbouring samples, except for the last sample
+        which averages with the first sample of the same period. The stacked
+        powers T^1 .. T^rows are built by repeated doubling.
+    '''
+    step = numpy.zeros((phase, phase))
+    index = numpy.arange(phase - 1)
+    step[index, index] = gain
+    step[index, index + 1] = gain
+    step[-1, -1] = gain
+    step[-1, :2] += gain * gain
+    # Transposed powers side by side, so a period (or a stack of periods)
+    # right-multiplies them: period @ [T^1' T^2' ...]
+    step = step.T
+    powers = step
+    power = step
+    while powers.shape[1] < rows * phase:
+        powers = numpy.concatenate((powers, power @ powers), axis=1)
+        power = power @ power
+    return numpy.ascontiguousarray(powers[:, :rows * phase], dtype=dtype)
+
+
+def _ringbuffer_rows(out, gain):
+    ''' Fill periods 1 onwards of out (shape (..., periods, phase), period 0
+        holding the initial data) in place with the ring buffer recurrence,
+        RINGBUFFER_BLOCK samples' worth of periods per matrix product. Every
+        leading index is an independent string with the same phase and gain.
+    '''
+    periods, phase = out.shape[-2:]
+    rows = max(RINGBUFFER_BLOCK // phase, 1)
+    powers = _ringbuffer_powers(phase, float(gain), rows, out.dtype)
+    for begin in range(1, periods, rows):
+        count = min(rows, periods - begin)
+        block = out[..., begin - 1, :] @ powers[:, :count * phase]
+        out[..., begin:begin + count, :] = block.reshape(
+            out.shape[:-2] + (count, phase))
+
+
+def _ringbuffer_fill(data, length, gain):
+    ''' Return 'length' samples of the ring buffer seeded with the period
+        'data', evaluated as described in ringbuffer. For periods of up to
+        RINGBUFFER_ROWS_MAX_PHASE samples data may also be 2D, one period per
+        row, giving one string per row.
+    '''
+    phase = data.shape[-1]
+    if 1 < phase <= RINGBUFFER_ROWS_MAX_PHASE:
+        periods = -(-length // phase)
+        out = numpy.empty(data.shape[:-1] + (periods, phase), dtype=data.dtype)
+        out[..., :1, :] = data[..., None, :]
+        _ringbuffer_rows(out, gain)
+        return out.reshape(data.shape[:-1] + (-1,))[..., :length]
+    out = numpy.resize(data, length)
+    order = 1
+    if phase > 1:
+        order = max(1, min(RINGBUFFER_MAX_ORDER, RINGBUFFER_BLOCK // (phase - 1)))
+    warmup = min(order * phase, length)
+    _ringbuffer_blocks(out, phase, warmup, phase, 1, gain)
+    _ringbuffer_blocks(out, warmup, length, phase, order, gain)
+    return out
+
+
 def ringbuffer(data, length, decay=1.0, rate=44100):
     ''' Repeat data for 'length' amount of time, smoothing to reduce higher
         frequency oscillation. decay is the percent of amplitude decrease.
+
+        The recurrence is evaluated block-wise with numpy: short periods a
+        block of periods per matrix product, longer ones the first periods
+        one period at a time and the rest several periods per block.
     '''
-    phase = len(data)
-    length = int(rate * length)
-    out = numpy.resize(data, length)
-    for i in range(phase, length):
-        index = i - phase
-        out[i] = (out[index] + out[index + 1]) * 0.5 * decay
-    return out
+    return _ringbuffer_fill(numpy.asarray(data), int(rate * length),
+                            0.5 * decay)
+
 
+def random_state(seed=None):
+    ''' Return random number source for 'seed': the global numpy.random
+        state for None, otherwise a numpy.random.Generator built from an int
+        seed (or the Generator itself if one is passed)
+    '''
+    if seed is None:
+        return numpy.random
+    return numpy.random.default_rng(seed)
 
-def pluck(freq, length, decay=0.998, rate=44100):
+
+def pluck(freq, length, decay=0.998, rate=44100, seed=None, dtype=None):
     ''' Create a pluck noise at freq by sending white noise through a ring buffer
         http://en.wikipedia.org/wiki/Karplus-Strong_algorithm
+        Passing an int 'seed' (or a numpy.random.Generator) makes the noise,
+        and therefore the output, reproducible.
     '''
     freq = float(freq)
     phase = int(rate / freq)
-    data = numpy.random.random(phase) * 2 - 1
+    data = random_state(seed).random(phase) * 2 - 1
+    data = data.astype(sample_dtype(dtype), copy=False)
     return ringbuffer(data, length, decay, rate)
+
+
+def pluck_many(freqs, lengths, decays=0.998, rate=44100, seeds=None,
+               dtype=None):
+    ''' Create pluck noises for several strings at once. 'lengths', 'decays'
+        and 'seeds' may be scalars or sequences matching 'freqs'; each string
+        seeds its noise as pluck does, so string i matches
+        pluck(freqs[i], lengths[i], decays[i], rate, seeds[i]). Strings with
+        the same short period (RINGBUFFER_ROWS_MAX_PHASE samples or less)
+        and decay, such as a high note repeated in a roll, share one ring
+        buffer evaluation, every block advancing all of them with a single
+        matrix product. Returns a list of arrays, one per string.
+    '''
+    freqs = [float(freq) for freq in freqs]
+    count = len(freqs)
+    lengths = numpy.broadcast_to(numpy.asarray(lengths, dtype=float), (count,))
+    decays = numpy.broadcast_to(numpy.asarray(decays, dtype=float), (count,))
+    if seeds is None or numpy.ndim(seeds) == 0:
+        seeds = [seeds] * count
+    dtype = sample_dtype(dtype)
+    phases = [int(rate / freq) for freq in freqs]
+    noise = [(random_state(seed).random(phase) * 2 - 1).astype(dtype, copy=False)
+             for phase, seed in zip(phases, seeds)]
+    groups = {}
+    for row, (phase, decay) in enumerate(zip(phases, decays.tolist())):
+        groups.setdefault((phase, decay), []).append(row)
+    out = [None] * count
+    for (phase, decay), rows in groups.items():
+        sizes = [int(rate * lengths[row]) for row in rows]
+        if len(rows) == 1 or not 1 < phase <= RINGBUFFER_ROWS_MAX_PHASE:
+            # Longer periods are dominated by the convolution arithmetic
+            # rather than call overhead, batching them does not pay off
+            for row, size in zip(rows, sizes):
+                out[row] = _ringbuffer_fill(noise[row], size, 0.5 * decay)
+            continue
+        data = numpy.array([noise[row] for row in rows], dtype=dtype)
+        data = data.reshape(len(rows), phase)
+        block = _ringbuffer_fill(data, max(sizes), 0.5 * decay)
+        for row, string, size in zip(rows, block, sizes):
+            out[row] = string[:size]
+    return out
@@ -1,6 +1,14 @@
+import bisect
+import copy
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy
 
 from musical.audio import source
+from musical.audio.cache import RenderCache
 
 # XXX: Early implementation of timeline/hit concepts. Needs lots of work
 
@@ -11,53 +19,242 @@ from musical.audio import source
 class Hit:
 
   ''' Rough draft of Hit class. Stores information about the hit and generates
-      the audio array accordingly. Currently implements a basic cache to avoid
-      having to rerender identical hits
+      the audio array accordingly. Rendered hits are kept in a bounded LRU
+      cache to avoid having to rerender identical hits. The cache can be
+      replaced with any object supporting get() and item assignment, such as
+      a DiskCache shared between processes
   '''
 
-  cache = {}
+  cache = RenderCache()
 
-  def __init__(self, note, length):
+  def __init__(self, note, length, decay=0.998, rate=44100, seed=None):
+    # An int "seed" makes the rendered audio reproducible across processes
     self.note = note
     self.length = length
+    self.decay = decay
+    self.rate = rate
+    self.seed = seed
+
+  def key(self):
+    # Cache key identifying the rendered audio of this hit
+    return (str(self.note), self.length, self.decay, self.rate, self.seed,
+            source.sample_dtype().name)
 
   def render(self):
     # Render hit of "key" for "length" amound of seconds
     # XXX: Currently only uses a string pluck
-    key = (str(self.note), self.length)
-    if key not in Hit.cache:
-      Hit.cache[key] = source.pluck(self.note, self.length)
-    return Hit.cache[key]
+    key = self.key()
+    data = Hit.cache.get(key)
+    if data is None:
+      data = self.pluck()
+      Hit.cache[key] = data
+    return data
+
+  def pluck(self, dtype=None):
+    # Synthesize the hit with source.pluck, bypassing the cache
+    return source.pluck(self.note, self.length, self.decay, self.rate,
+                        self.seed, dtype)
+
+  @classmethod
+  def render_many(cls, hits, workers=None):
+    # Render a list of hits, synthesizing all uncached hits in a single
+    # source.pluck_many batch. Returns the audio arrays in order of "hits".
+    # With "workers" (a process count, or a ProcessPoolExecutor to reuse)
+    # the uncached hits are synthesized in parallel in a process pool
+    hits = list(hits)
+    rendered = {}
+    missing = {}
+    for hit in hits:
+      key = hit.key()
+      if key in rendered or key in missing:
+        continue
+      data = cls.cache.get(key)
+      if data is None:
+        missing[key] = hit
+      else:
+        rendered[key] = data
+    pending = list(missing.values())
+    if workers is None or len(pending) < 2:
+      audio = _pluck_hits(pending)
+    else:
+      audio = _pluck_hits_parallel(pending, workers)
+    for key, data in zip(missing, audio):
+      cls.cache[key] = data
+      rendered[key] = data
+    return [rendered[hit.key()] for hit in hits]
+
+
+def _pluck_hits(hits, dtype=None):
+  # Synthesize "hits" with source.pluck_many, one batch per sample rate.
+  # A rate with a single hit is plucked directly. Returns the audio arrays
+  # in order of "hits"
+  batches = defaultdict(list)
+  for position, hit in enumerate(hits):
+    batches[hit.rate].append(position)
+  audio = [None] * len(hits)
+  for rate, positions in batches.items():
+    batch = [hits[position] for position in positions]
+    if len(batch) == 1:
+      audio[positions[0]] = batch[0].pluck(dtype)
+      continue
+    rendered = source.pluck_many(
+        [hit.note for hit in batch], [hit.length for hit in batch],
+        [hit.decay for hit in batch], rate, [hit.seed for hit in batch],
+        dtype)
+    for position, data in zip(positions, rendered):
+      audio[position] = data
+  return audio
+
+
+def _pluck_into_shared(name, total, dtype, offsets, hits):
+  # Process pool worker: synthesize "hits" into the shared memory block
+  # "name" (an array of "total" samples of "dtype") at "offsets"
+  for hit in hits:
+    if hit.seed is None:
+      # Forked workers share the parent's global random state, draw fresh
+      # entropy instead so unseeded hits still get independent noise
+      hit.seed = numpy.random.default_rng()
+  shm = shared_memory.SharedMemory(name=name)
+  try:
+    out = numpy.ndarray((total,), dtype=dtype, buffer=shm.buf)
+    for offset, data in zip(offsets, _pluck_hits(hits, dtype)):
+      out[offset:offset + len(data)] = data
+    del out
+  finally:
+    shm.close()
+
+
+def _pluck_hits_parallel(hits, workers):
+  # Synthesize "hits" in a process pool. Workers write straight into one
+  # shared memory block, and the parent copies each hit out of it
+  sizes = [int(hit.rate * hit.length) for hit in hits]
+  offsets = numpy.concatenate(([0], numpy.cumsum(sizes))).tolist()
+  total = offsets.pop()
+  dtype = source.sample_dtype()
+  shm = shared_memory.SharedMemory(
+      create=True, size=max(total, 1) * dtype.itemsize)
+  try:
+    if isinstance(workers, int):
+      with ProcessPoolExecutor(workers) as pool:
+        _submit_shared(pool, workers, shm.name, total, dtype, offsets, hits)
+    else:
+      _submit_shared(workers, os.cpu_count() or 1, shm.name, total, dtype,
+                     offsets, hits)
+    out = numpy.ndarray((total,), dtype=dtype, buffer=shm.buf)
+    audio = [out[offset:offset + size].copy()
+             for offset, size in zip(offsets, sizes)]
+    del out
+  finally:
+    shm.close()
+    shm.unlink()
+  return audio
+
+
+def _submit_shared(pool, tasks, name, total, dtype, offsets, hits):
+  # Deal hits out round robin to "tasks" tasks and wait for all of them
+  futures = [
+      pool.submit(_pluck_into_shared, name, total, dtype.name,
+                  offsets[task::tasks], hits[task::tasks])
+      for task in range(min(tasks, len(hits)))]
+  for future in futures:
+    future.result()
+
+
+def _mix(out, offset, index, data):
+  # Add the part of "data" (starting at sample "index") that overlaps "out"
+  # (starting at sample "offset") into "out"
+  lo = max(index, offset)
+  hi = min(index + len(data), offset + len(out))
+  if hi > lo:
+    out[lo - offset:hi - offset] += data[lo - index:hi - index]
 
 
 class Timeline:
 
-  ''' Rough draft of Timeline class. Handles the timing and mixing of Hits
+  ''' Rough draft of Timeline class. Handles the timing and mixing of Hits.
+      Besides the hits by time, keeps an index of hit start samples in
+      ascending order so a window of the timeline can be rendered by only
+      looking at the hits overlapping it
   '''
 
-  def __init__(self, rate=44100):
+  def __init__(self, rate=44100, seed=None):
+    # Hits added without a seed of their own are given "seed", so the
+    # whole timeline renders reproducibly
     self.rate = rate
+    self.seed = seed
     self.hits = defaultdict(list)
+    self.starts = []
+    self.events = []
+    self.longest = 0
+    self.length = 0.0
 
   def add(self, time, hit):
-    # Add "hit" at "time" seconds in
+    # Add "hit" at "time" seconds in, inserting it into the sorted index.
+    # An unseeded hit is stored as a copy seeded with the timeline's seed,
+    # leaving "hit" itself untouched for use elsewhere
+    if hit.seed is None and self.seed is not None:
+      hit = copy.copy(hit)
+      hit.seed = self.seed
     self.hits[time].append(hit)
+    index = int(time * self.rate)
+    position = bisect.bisect_right(self.starts, index)
+    self.starts.insert(position, index)
+    self.events.insert(position, hit)
+    self.longest = max(self.longest, int(hit.length * self.rate))
+    self.length = max(self.length, time + hit.length)
 
   def calculate_length(self):
     # Determine length of playback from end of last hit
-    length = 0.0
-    for time, hits in self.hits.items():
-      for hit in hits:
-        length = max(length, time + hit.length)
-    return length
+    return self.length
 
-  def render(self):
-    # Return timeline as audio array by rendering the hits
-    out = source.silence(self.calculate_length())
-    for time, hits in self.hits.items():
-      index = int(time * self.rate)
-      for hit in hits:
-        data = hit.render()
-        out[index:index + len(data)] += data
+  def window(self, start, stop):
+    # Return (start sample, hit) of the hits sounding between samples
+    # "start" and "stop", in order of start. Hits starting earlier than
+    # the longest hit before "start" cannot overlap and are never visited
+    lo = bisect.bisect_left(self.starts, start - self.longest)
+    hi = bisect.bisect_left(self.starts, stop)
+    return [(self.starts[i], self.events[i]) for i in range(lo, hi)
+            if self.starts[i] + int(self.events[i].length * self.rate) > start]
+
+  def render(self, start=0.0, end=None, workers=None):
+    # Return timeline as audio array by rendering the hits. "start" and
+    # "end" (in seconds) select a window, rendering only the hits in it.
+    # "workers" synthesizes the hits in a process pool, see Hit.render_many
+    if end is None:
+      end = self.calculate_length()
+    offset = int(start * self.rate)
+    out = source.silence(max(int(end * self.rate) - offset, 0), 1)
+    events = self.window(offset, offset + len(out))
+    rendered = Hit.render_many((hit for index, hit in events), workers)
+    for (index, hit), data in zip(events, rendered):
+      _mix(out, offset, index, data)
     return out
 
+  def render_stream(self, block_size=4096, start=0.0, end=None):
+    # Yield the timeline (or the window from "start" to "end" seconds) as
+    # consecutive audio arrays of "block_size" samples, the last one may be
+    # shorter. Only hits overlapping the current block are rendered and
+    # mixed, so memory is bounded by the block size and the number of hits
+    # sounding at once rather than by the length of the piece
+    if end is None:
+      end = self.calculate_length()
+    offset = int(start * self.rate)
+    total = int(end * self.rate)
+    events = self.window(offset, total)
+    active = []
+    pending = 0
+    for begin in range(offset, total, block_size):
+      stop = min(begin + block_size, total)
+      starting = []
+      while pending < len(events) and events[pending][0] < stop:
+        starting.append(events[pending])
+        pending += 1
+      rendered = Hit.render_many(hit for index, hit in starting)
+      active.extend(
+          (index, data) for (index, hit), data in zip(starting, rendered))
+      block = source.silence(stop - begin, 1)
+      for index, data in active:
+        _mix(block, begin, index, data)
+      active = [(index, data) for index, data in active
+                if index + len(data) > stop]
+      yield block
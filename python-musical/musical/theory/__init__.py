@@ -1,3 +1,6 @@
 from .note import Note
+from .notearray import NoteArray
 from .scale import Scale
-from .chord import Chord
\ No newline at end of file
+from .chord import Chord
+from .fretboard import Fretboard
+from . import identify
@@ -1,11 +1,37 @@
+import functools
+
+from .note import Note
+from .notearray import NoteArray
+from .scale import NAMED_SCALES
 from .scale import Scale
 
-# TODO: Chord identification
 # TODO: Extended and "added note" chords
 
+# Chord qualities as halfsteps above the root
+NAMED_CHORDS = {
+    'major': (0, 4, 7),
+    'minor': (0, 3, 7),
+    'augmented': (0, 4, 8),
+    'diminished': (0, 3, 6),
+    'sus2': (0, 2, 7),
+    'sus4': (0, 5, 7),
+    'major6': (0, 4, 7, 9),
+    'minor6': (0, 3, 7, 9),
+    'dominant7': (0, 4, 7, 10),
+    'major7': (0, 4, 7, 11),
+    'minor7': (0, 3, 7, 10),
+    'minormajor7': (0, 3, 7, 11),
+    'halfdiminished7': (0, 3, 6, 10),
+    'diminished7': (0, 3, 6, 9),
+    'augmented7': (0, 4, 8, 10),
+    'power': (0, 7),
+}
+
+
 class Chord:
 
-    ''' Chord class handles multiple chord construction and manipulation
+    ''' Chord class handles multiple chord construction and manipulation.
+        Notes can be given as any iterable of Notes, including a NoteArray
     '''
 
     def __init__(self, notes):
@@ -20,6 +46,11 @@ class Chord:
     def __iter__(self):
         return iter(self.notes)
 
+    def as_array(self):
+        ''' Return notes of the chord as a NoteArray
+        '''
+        return NoteArray(self.notes)
+
     def invert_up(self):
         ''' Invert chord up, shifting the lowest note up one octave
         '''
@@ -36,15 +67,39 @@ class Chord:
         notes[index] = notes[index].transpose(-12)
         return Chord(notes)
 
+    @classmethod
+    def named(cls, root, quality):
+        ''' Return chord of "quality" (a key of NAMED_CHORDS) on "root"
+        '''
+        root = Note(root)
+        return cls(root.transpose(interval)
+                   for interval in NAMED_CHORDS[quality])
+
     @classmethod
     def fromscale(cls, root, scale):
         ''' Return chord of "root" within "scale"
         '''
-        scale = Scale(root, scale)
+        scale = Scale.cached(root, scale)
         third = scale.transpose(root, 2)
         fifth = scale.transpose(root, 4)
         return cls((root, third, fifth))
 
+    @classmethod
+    def diatonic(cls, root, scale, seventh=False):
+        ''' Return tuple of the chords stacked in thirds on every degree
+            of "scale" (a name, intervals or Scale) rooted at "root", triads
+            or seventh chords. The tonic chord is at the octave of "root".
+            Named scales are looked up in the precomputed tables, chords are
+            shared and must not be modified
+        '''
+        root = Note(root)
+        if isinstance(scale, str):
+            scale = Scale.intervals_from_name(scale)
+        elif isinstance(scale, Scale):
+            scale = scale.intervals
+        return _diatonic(root.index % 12, tuple(scale), 4 if seventh else 3,
+                         root.octave)
+
     @classmethod
     def major(cls, root):
         ''' Return major triad
@@ -74,10 +129,39 @@ class Chord:
         ''' Return chord progression of scale instance as a list.
             Octave of tonic chord is at "base_octave"
         '''
-        prog = []
-        for root in scale:
-            root = root.transpose(12 * base_octave)
-            third = scale.transpose(root, 2)
-            fifth = scale.transpose(root, 4)
-            prog.append(cls((root, third, fifth)))
-        return prog
+        return list(_diatonic(scale.root.index % 12, scale.intervals, 3,
+                              base_octave))
+
+
+@functools.lru_cache(maxsize=1024)
+def _diatonic(pitch_class, intervals, size, octave):
+    # Chords of "size" notes stacked in thirds on every scale degree
+    scale = Scale.cached(Note(pitch_class), intervals)
+    base = scale.root.index + 12 * octave
+    chords = []
+    for degree in range(len(scale)):
+        notes = []
+        for i in range(size):
+            cycle, step = divmod(degree + 2 * i, len(scale))
+            notes.append(Note(base + cycle * scale.span + scale.offsets[step]))
+        chords.append(Chord(notes))
+    return tuple(chords)
+
+
+def _diatonic_table(size):
+    return {(pitch_class, name): _diatonic(pitch_class, intervals, size, 0)
+            for name, intervals in NAMED_SCALES.items()
+            for pitch_class in range(12)}
+
+
+def __getattr__(name):
+    # Diatonic triads and seventh chords of every named scale in every key,
+    # keyed by (root pitch class, scale name), tonic chord at octave 0.
+    # Built on first access instead of at import
+    if name == 'DIATONIC_TRIADS':
+        table = globals()[name] = _diatonic_table(3)
+        return table
+    if name == 'DIATONIC_SEVENTHS':
+        table = globals()[name] = _diatonic_table(4)
+        return table
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -0,0 +1,63 @@
+import numpy
+
+from .notearray import NoteArray
+
+# Frets 0 (open) to 22 of a standard banjo or guitar neck
+DEFAULT_FRETS = 23
+
+
+class Fretboard:
+
+    ''' Pitch matrix of a fretted instrument: pitches[string, fret] is the
+        note index sounded by a string (0 = first string) stopped at a fret.
+        The matrix is computed once per tuning, so fretting chords and rolls
+        are array lookups instead of per-note transpositions. Chords are
+        sequences of one fret per string, first string first, and strings
+        in rolls are numbered from 1 as on a tab
+    '''
+
+    def __init__(self, tuning, frets=DEFAULT_FRETS):
+        ''' Instantiate from the open strings, first string first, example:
+            Fretboard(['D4', 'B3', 'G3', 'D3', 'G4'])
+        '''
+        self.tuning = NoteArray(tuning)
+        self.frets = frets
+        self.pitches = self.tuning.index[:, None] + numpy.arange(frets)
+        self.pitches.flags.writeable = False
+        self._strings = numpy.arange(len(self.tuning))
+
+    def __repr__(self):
+        return 'Fretboard(%r, frets=%d)' % (self.tuning.names().tolist(),
+                                            self.frets)
+
+    def __len__(self):
+        return len(self.tuning)
+
+    def _check(self, chord):
+        chord = numpy.asarray(chord)
+        if chord.shape[-1:] != (len(self),):
+            raise ValueError('%s needs one fret per string, got %s' %
+                             (self, chord.tolist()))
+        if ((chord < 0) | (chord >= self.frets)).any():
+            raise ValueError('%s has no fret in %s' % (self, chord.tolist()))
+        return chord
+
+    def fret(self, chord):
+        ''' Return array of note indexes sounded by every string with chord
+            held. An array of chords (shape (n, strings)) gives one row per
+            chord
+        '''
+        return self.pitches[self._strings, self._check(chord)]
+
+    def notes(self, chord):
+        ''' Return NoteArray of the strings with chord held
+        '''
+        return NoteArray(self.fret(chord))
+
+    def roll(self, chord, strings):
+        ''' Return array of note indexes sounded by picking strings (string
+            numbers, 1 = first string) in order with chord held. An array of
+            chords gives one row per chord
+        '''
+        strings = numpy.asarray(strings) - 1
+        return self.fret(chord)[..., strings]
@@ -0,0 +1,135 @@
+import functools
+
+import numpy
+
+from .chord import NAMED_CHORDS
+from .note import Note
+from .notearray import NoteArray
+from .scale import NAMED_SCALES
+
+# Pitch class sets are 12 bit masks, bit n set when pitch class n (C = 0)
+# is present. Every named scale and chord quality at every root is
+# precomputed as a mask, so identifying a set of notes compares its mask
+# against the whole table at once.
+
+POPCOUNT = numpy.array([bin(mask).count('1') for mask in range(4096)])
+
+
+def pitch_class_mask(notes):
+    ''' Return the 12 bit pitch class mask of an iterable of notes (or a
+        NoteArray)
+    '''
+    mask = 0
+    for pitch_class in numpy.unique(NoteArray(notes).index % 12):
+        mask |= 1 << int(pitch_class)
+    return mask
+
+
+def _rotate(mask, root):
+    # Transpose a pitch class mask up by "root" halfsteps
+    return ((mask << root) | (mask >> (12 - root))) & 0xFFF
+
+
+def _build(named, steps):
+    # Return (masks, [(root, name)]) for every root of every named entry
+    masks = []
+    labels = []
+    for name, intervals in named.items():
+        mask = 0
+        for offset in steps(intervals):
+            mask |= 1 << (offset % 12)
+        for root in range(12):
+            masks.append(_rotate(mask, root))
+            labels.append((Note(root), name))
+    return numpy.array(masks), labels
+
+
+def _scale_offsets(intervals):
+    return [sum(intervals[:i]) for i in range(len(intervals))]
+
+
+SCALE_MASKS, SCALE_LABELS = _build(NAMED_SCALES, _scale_offsets)
+CHORD_MASKS, CHORD_LABELS = _build(NAMED_CHORDS, tuple)
+
+
+def _scale_scores(masks):
+    # Scales must contain every note, ranked by fewest notes left over. An
+    # empty set matches nothing
+    masks = numpy.asarray(masks)[..., None]
+    missing = POPCOUNT[masks & ~SCALE_MASKS & 0xFFF]
+    extra = POPCOUNT[SCALE_MASKS & ~masks & 0xFFF]
+    return numpy.where((missing == 0) & (masks != 0), extra, -1)
+
+
+def _chord_scores(masks):
+    # Chords must contain every note or be contained in the notes, ranked
+    # by how many notes differ. An empty set matches nothing
+    masks = numpy.asarray(masks)[..., None]
+    missing = POPCOUNT[masks & ~CHORD_MASKS & 0xFFF]
+    extra = POPCOUNT[CHORD_MASKS & ~masks & 0xFFF]
+    return numpy.where(((missing == 0) | (extra == 0)) & (masks != 0),
+                       missing + extra, -1)
+
+
+def _ranked(scores, labels, limit):
+    candidates = numpy.flatnonzero(scores >= 0)
+    order = candidates[numpy.argsort(scores[candidates], kind='stable')]
+    return [labels[i] for i in order[:limit]]
+
+
+@functools.lru_cache(maxsize=4096)
+def _scales_for_mask(mask):
+    return tuple(_ranked(_scale_scores(mask), SCALE_LABELS, None))
+
+
+@functools.lru_cache(maxsize=4096)
+def _chords_for_mask(mask):
+    return tuple(_ranked(_chord_scores(mask), CHORD_LABELS, None))
+
+
+def identify_scales(notes, limit=None):
+    ''' Return ranked (root, scale name) candidates for a set of notes:
+        every named scale containing all of the notes, fewest extra notes
+        first. root is a Note at octave 0. No notes give no candidates
+    '''
+    return list(_scales_for_mask(pitch_class_mask(notes))[:limit])
+
+
+def identify_chords(notes, limit=None):
+    ''' Return ranked (root, chord quality) candidates for a set of notes:
+        chords containing all of the notes or made only of notes in the set,
+        fewest differing notes first. root is a Note at octave 0. No notes
+        give no candidates
+    '''
+    return list(_chords_for_mask(pitch_class_mask(notes))[:limit])
+
+
+def _label(note_sets, scores, labels):
+    masks = numpy.array([mask if isinstance(mask, (int, numpy.integer))
+                         else pitch_class_mask(mask) for mask in note_sets],
+                        dtype=numpy.int64)
+    if len(masks) == 0:
+        return []
+    scores = scores(masks)
+    # Unmatched candidates sort last
+    unmatched = numpy.iinfo(scores.dtype).max
+    scores = numpy.where(scores < 0, unmatched, scores)
+    best = scores.argmin(axis=1)
+    matched = scores[numpy.arange(len(masks)), best] != unmatched
+    return [labels[i] if ok else None for i, ok in zip(best, matched)]
+
+
+def label_scales(note_sets):
+    ''' Return the best (root, scale name) for each of many note sets (each
+        an iterable of notes or a pitch class mask), or None where no scale
+        contains the set. All sets are scored against the table in one pass
+    '''
+    return _label(note_sets, _scale_scores, SCALE_LABELS)
+
+
+def label_chords(note_sets):
+    ''' Return the best (root, chord quality) for each of many note sets
+        (each an iterable of notes or a pitch class mask), or None where no
+        chord matches. All sets are scored against the table in one pass
+    '''
+    return _label(note_sets, _chord_scores, CHORD_LABELS)
@@ -1,12 +1,27 @@
+import functools
+
+# Notes with an index in range(NOTE_RANGE) are interned and have their
+# frequency precomputed (C0 up to B10)
+NOTE_RANGE = 132
+
+
 class Note:
 
     ''' Note class handles note/octave object, transposition, and frequency
-        calculation
+        calculation. Notes are immutable and hashable, and notes within
+        NOTE_RANGE are interned: Note('C4') is Note(48)
     '''
 
+    __slots__ = ('index',)
+
     NOTES = ['c','c#','d','d#','e','f','f#','g','g#','a','a#','b']
 
-    def __init__(self, note):
+    FREQUENCIES = tuple(16.35159783128741 * 2.0 ** (float(index) / 12.0)
+                        for index in range(NOTE_RANGE))
+
+    _interned = {}
+
+    def __new__(cls, note):
         ''' Instantiate note, examples:
             Note('C')      # C4 (middle C)
             Note(0)        # C at octave 0
@@ -19,14 +34,27 @@ class Note:
 
         '''
         if isinstance(note, str):
-            self.index = Note.index_from_string(note)
+            index = Note.index_from_string(note)
         elif isinstance(note, tuple):
-            self.index = Note.index_from_string(note[0]) + 12 * note[1]
+            index = Note.index_from_string(note[0]) + 12 * note[1]
         elif isinstance(note, Note):
-            self.index = note.index
+            return note
         else:
-            self.index = int(note)
-    
+            index = int(note)
+        self = cls._interned.get(index)
+        if self is None:
+            self = object.__new__(cls)
+            object.__setattr__(self, 'index', index)
+            if 0 <= index < NOTE_RANGE:
+                cls._interned[index] = self
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Note is immutable')
+
+    def __reduce__(self):
+        return (Note, (self.index,))
+
     def get_note_name(self):
         return f"{self.note}{self.octave}"
 
@@ -36,12 +64,23 @@ class Note:
     def __lt__(self, other):
         return self.index < other.index
 
+    def __le__(self, other):
+        return self.index <= other.index
+
     def __gt__(self, other):
         return self.index > other.index
 
+    def __ge__(self, other):
+        return self.index >= other.index
+
     def __eq__(self, other):
+        if not isinstance(other, Note):
+            return NotImplemented
         return self.index == other.index
 
+    def __hash__(self):
+        return hash(self.index)
+
     def __float__(self):
         return self.frequency()
 
@@ -55,9 +94,10 @@ class Note:
     def octave(self):
         ''' octave number property
         '''
-        return int(self.index / 12)
+        return self.index // 12
 
     @classmethod
+    @functools.lru_cache(maxsize=1024)
     def index_from_string(cls, note):
         ''' Get index number from note string
         '''
@@ -95,6 +135,8 @@ class Note:
     def frequency(self):
         ''' Return frequency of note
         '''
+        if 0 <= self.index < NOTE_RANGE:
+            return Note.FREQUENCIES[self.index]
         return 16.35159783128741 * 2.0 ** (float(self.index) / 12.0)
 
 # Tests
@@ -0,0 +1,123 @@
+import numpy
+
+from .note import Note
+from .note import NOTE_RANGE
+
+_FREQUENCIES = numpy.array(Note.FREQUENCIES)
+_NAMES = numpy.array(Note.NOTES)
+
+
+class NoteArray:
+
+    ''' Array of notes backed by a numpy array of note indexes, for working on
+        many notes at once. Mirrors the Note interface (transpose, at_octave,
+        frequency, names) with vectorized operations; comparisons return
+        boolean arrays. Iterating or indexing with an int gives Notes
+    '''
+
+    __slots__ = ('index',)
+
+    def __init__(self, notes):
+        ''' Instantiate from another NoteArray, an integer array of note
+            indexes or an iterable of anything Note accepts, examples:
+            NoteArray(['G4', 'B4', 'D5'])
+            NoteArray(numpy.arange(48, 60))
+            NoteArray(chord)
+        '''
+        if isinstance(notes, NoteArray):
+            index = notes.index
+        elif isinstance(notes, numpy.ndarray) and notes.dtype.kind in 'iu':
+            index = notes
+        else:
+            index = [Note(note).index for note in notes]
+        self.index = numpy.array(index, dtype=numpy.int64)
+
+    def __repr__(self):
+        return 'NoteArray(%r)' % self.names().tolist()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return (Note(int(index)) for index in self.index)
+
+    def __getitem__(self, key):
+        index = self.index[key]
+        if numpy.ndim(index) == 0:
+            return Note(int(index))
+        return NoteArray(index)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.index if dtype is None else self.index.astype(dtype)
+
+    def __eq__(self, other):
+        return self.index == _indexes(other)
+
+    def __ne__(self, other):
+        return self.index != _indexes(other)
+
+    def __lt__(self, other):
+        return self.index < _indexes(other)
+
+    def __le__(self, other):
+        return self.index <= _indexes(other)
+
+    def __gt__(self, other):
+        return self.index > _indexes(other)
+
+    def __ge__(self, other):
+        return self.index >= _indexes(other)
+
+    __hash__ = None
+
+    @property
+    def note(self):
+        ''' note name of every note, as a string array
+        '''
+        return _NAMES[self.index % 12]
+
+    @property
+    def octave(self):
+        ''' octave number of every note
+        '''
+        return numpy.floor_divide(self.index, 12)
+
+    def names(self):
+        ''' Return names with octave ('g4') of every note, as a string array
+        '''
+        return numpy.char.add(self.note, self.octave.astype(str))
+
+    def tolist(self):
+        ''' Return list of Notes
+        '''
+        return list(self)
+
+    def at_octave(self, octave):
+        ''' Return new array with every note at the given octave(s)
+        '''
+        return NoteArray(self.index % 12 + 12 * numpy.asarray(octave))
+
+    def transpose(self, halfsteps):
+        ''' Return new array transposed by halfstep delta, a number or an
+            array of one delta per note
+        '''
+        return NoteArray(self.index + numpy.asarray(halfsteps))
+
+    def frequency(self):
+        ''' Return array of note frequencies
+        '''
+        inside = (self.index >= 0) & (self.index < NOTE_RANGE)
+        if inside.all():
+            return _FREQUENCIES[self.index]
+        return numpy.where(
+            inside, _FREQUENCIES[self.index.clip(0, NOTE_RANGE - 1)],
+            16.35159783128741 * 2.0 ** (self.index / 12.0))
+
+
+def _indexes(notes):
+    # Note indexes of a NoteArray, Note, or anything NoteArray accepts
+    if isinstance(notes, NoteArray):
+        return notes.index
+    if numpy.ndim(notes) == 0:
+        return Note(notes).index
+    return NoteArray(notes).index
@@ -1,8 +1,11 @@
+import functools
+
 from .note import Note
-import itertools
+from .notearray import NoteArray
+import numpy
 
 # TODO: Non-rooted scales? (just hold intervals and apply root later on)
-# TODO: Probable scale identification (from a set of notes)
+# Scale identification from a set of notes lives in identify.py
 
 NAMED_SCALES = {
     'major': (2, 2, 1, 2, 2, 2, 1),
@@ -37,6 +40,10 @@ class Scale:
     ''' Scale class manages rooted scales. Can be constructed by passing a root
         and either a list of intervals or a scale name (which is used to look up
         the intervals from NAMED_SCALES dict
+
+        The cumulative intervals (offset of every degree from the root) and a
+        bitmask of the offsets in the scale are precomputed, so get, index
+        and transpose are constant time divmod lookups
     '''
 
     def __init__(self, root, scale):
@@ -46,6 +53,18 @@ class Scale:
         elif isinstance(scale, Scale):
             scale = scale.intervals
         self.intervals = tuple(scale)
+        # Halfsteps spanned by one cycle of the scale (12 for an octave)
+        self.span = sum(self.intervals)
+        self.offsets = tuple(sum(self.intervals[:i])
+                             for i in range(len(self.intervals)))
+        self.mask = 0
+        degrees = [-1] * self.span
+        for degree, offset in enumerate(self.offsets):
+            self.mask |= 1 << offset
+            degrees[offset] = degree
+        self.degrees = tuple(degrees)
+        self._offsets = numpy.array(self.offsets)
+        self._degrees = numpy.array(self.degrees)
 
     def __str__(self):
         return f'Scale({self.root}, {self.intervals})'
@@ -56,6 +75,18 @@ class Scale:
     def __iter__(self):
         return iter(self.get(i) for i in range(len(self)))
 
+    @classmethod
+    def cached(cls, root, scale):
+        ''' Return shared Scale instance for root and scale (a name,
+            intervals or Scale), built once per (root pitch class, intervals).
+            Cached scales must not be modified
+        '''
+        if isinstance(scale, str):
+            scale = cls.intervals_from_name(scale)
+        elif isinstance(scale, Scale):
+            scale = scale.intervals
+        return _cached_scale(Note(root).index % 12, tuple(scale))
+
     @classmethod
     def intervals_from_name(self, name):
         ''' Return intervals for named scale
@@ -67,31 +98,40 @@ class Scale:
         return NAMED_SCALES[name]
 
     def get(self, index):
-        ''' Get note from scale, 0 is the root at octave 0
+        ''' Get note from scale, 0 is the root at octave 0 and negative
+            indexes go down from there. An array of indexes gives a NoteArray
         '''
-        intervals = self.intervals
-        if index < 0:
-            index, intervals = abs(index), reversed(self.intervals)
-        intervals = itertools.cycle(self.intervals)
-        note = self.root
-        for i in range(index):
-            note = note.transpose(next(intervals))
-        return note
+        if numpy.ndim(index):
+            cycle, degree = numpy.divmod(numpy.asarray(index), len(self))
+            return NoteArray(self.root.index + cycle * self.span +
+                             self._offsets[degree])
+        cycle, degree = divmod(index, len(self))
+        return Note(self.root.index + cycle * self.span + self.offsets[degree])
 
     def index(self, note):
-        ''' Return index for note, if it exists in the scale
+        ''' Return index for note, if it exists in the scale. A NoteArray
+            (or list of notes) gives an array of indexes
         '''
-        intervals = itertools.cycle(self.intervals)
-        index = 0
-        x = self.root
-        while x < note:
-            x = x.transpose(next(intervals))
-            index += 1
-        if x == note:
-            return index
-        raise ValueError('%s not in %s' % (note, self))
+        if isinstance(note, (NoteArray, list)):
+            notes = NoteArray(note)
+            cycle, offset = numpy.divmod(notes.index - self.root.index,
+                                         self.span)
+            if not ((self.mask >> offset) & 1).all():
+                missing = notes[((self.mask >> offset) & 1) == 0]
+                raise ValueError('%s not in %s' % (missing, self))
+            return cycle * len(self) + self._degrees[offset]
+        cycle, offset = divmod(note.index - self.root.index, self.span)
+        if not (self.mask >> offset) & 1:
+            raise ValueError('%s not in %s' % (note, self))
+        return cycle * len(self) + self.degrees[offset]
 
     def transpose(self, note, interval):
         ''' Transpose note with scale by intervals, 1 = second, 2 = third...
+            Works on a NoteArray too, returning a NoteArray
         '''
         return self.get(self.index(note) + interval)
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_scale(pitch_class, intervals):
+    return Scale(Note(pitch_class), intervals)
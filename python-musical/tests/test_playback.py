@@ -0,0 +1,119 @@
+import itertools
+import time
+
+import numpy
+
+from musical.audio import playback
+from musical.audio import source
+
+# Generous bound for calls that must return without waiting for playback
+NON_BLOCKING = 0.5
+
+
+def blocks(count, size=100, value=0.5):
+    return [numpy.full(size, value) for _ in range(count)]
+
+
+def endless(value=0.5, size=100):
+    # Stream that never ends on its own, slowed down so files stay small
+    for block in itertools.repeat(numpy.full(size, value)):
+        time.sleep(0.001)
+        yield block
+
+
+def settle(backend):
+    # Return the frame count once the player thread has stopped writing
+    frames = backend.frames
+    while True:
+        time.sleep(0.05)
+        if backend.frames == frames:
+            return frames
+        frames = backend.frames
+
+
+def test_player_writes_every_frame():
+    backend = playback.NullBackend()
+    with playback.Player(backend=backend) as player:
+        player.start(blocks(10) + [numpy.zeros(37)])
+        player.wait()
+        assert not player.playing()
+    assert backend.blocks == 11
+    assert backend.frames == 1037
+
+
+def test_player_plays_single_array():
+    backend = playback.NullBackend()
+    with playback.Player(backend=backend) as player:
+        player.start(numpy.zeros(500))
+        player.wait()
+    assert backend.blocks == 1
+    assert backend.frames == 500
+
+
+def test_player_file_backend(tmp_path):
+    path = str(tmp_path / 'out.wav')
+    data = numpy.sin(numpy.arange(1000) * 0.05) * 0.5
+    with playback.Player(backend=playback.FileBackend(path)) as player:
+        player.start(data[start:start + 128] for start in range(0, len(data), 128))
+        player.wait()
+    loaded, rate = source.wavefile(path, dtype=numpy.float64)
+    assert rate == 44100
+    numpy.testing.assert_allclose(loaded, data, atol=2.0 / 2 ** 15)
+
+
+def test_player_pause_resume_stop_do_not_block():
+    backend = playback.NullBackend()
+    player = playback.Player(backend=backend)
+    player.start(endless())
+
+    begin = time.perf_counter()
+    player.pause()
+    assert time.perf_counter() - begin < NON_BLOCKING
+    assert player.paused() and player.playing()
+    frames = settle(backend)
+    time.sleep(0.05)
+    assert backend.frames == frames
+
+    begin = time.perf_counter()
+    player.resume()
+    assert time.perf_counter() - begin < NON_BLOCKING
+    assert not player.paused()
+    time.sleep(0.05)
+    assert backend.frames > frames
+
+    begin = time.perf_counter()
+    player.stop()
+    assert time.perf_counter() - begin < NON_BLOCKING
+    assert not player.playing()
+    frames = backend.frames
+    time.sleep(0.05)
+    assert backend.frames == frames
+    player.close()
+
+
+def test_player_stop_while_paused():
+    player = playback.Player(backend=playback.NullBackend())
+    player.start(endless())
+    player.pause()
+    begin = time.perf_counter()
+    player.stop()
+    assert time.perf_counter() - begin < NON_BLOCKING
+    assert not player.playing()
+    player.close()
+
+
+def test_player_start_replaces_stream(tmp_path):
+    path = str(tmp_path / 'out.wav')
+    backend = playback.FileBackend(path)
+    with playback.Player(backend=backend) as player:
+        player.start(endless(value=0.5))
+        time.sleep(0.05)
+        assert backend.frames > 0
+        player.start(blocks(3, value=-0.25))
+        player.wait()
+        assert not player.playing()
+    loaded, rate = source.wavefile(path, dtype=numpy.float64)
+    assert len(loaded) == backend.frames
+    # The first stream stopped before the second one started
+    numpy.testing.assert_allclose(loaded[:-300], 0.5, atol=2.0 / 2 ** 15)
+    numpy.testing.assert_allclose(loaded[-300:], -0.25, atol=2.0 / 2 ** 15)
@@ -0,0 +1,80 @@
+import wave
+
+import numpy
+import pytest
+
+from musical.audio import save
+from musical.audio import source
+
+# Largest quantization error of each format, as a fraction of full scale
+TOLERANCE = {
+    'int16': 2.0 / 2 ** 15,
+    'int24': 2.0 / 2 ** 23,
+    'float32': 1e-7,
+}
+
+
+def signal(frames, channels=1):
+    data = numpy.sin(numpy.arange(frames) * 0.01) * 0.9
+    if channels == 1:
+        return data
+    return numpy.stack([data * (channel + 1) / channels
+                        for channel in range(channels)], axis=1)
+
+
+@pytest.mark.parametrize('format', sorted(save.WAVE_FORMATS))
+@pytest.mark.parametrize('channels', (1, 2))
+@pytest.mark.parametrize('frames', (1000, 1001))
+def test_wave_writer_round_trip(tmp_path, format, channels, frames):
+    path = str(tmp_path / 'out.wav')
+    data = signal(frames, channels)
+    with save.WaveWriter(path, 22050, channels, format) as writer:
+        writer.write(data[:300])
+        writer.write(data[300:])
+    assert writer.frames == frames
+
+    loaded, rate = source.wavefile(path, mono=False, dtype=numpy.float64)
+    assert rate == 22050
+    assert loaded.shape == data.shape
+    numpy.testing.assert_allclose(loaded, data, atol=TOLERANCE[format])
+
+    # Chunks are padded to an even size, and the RIFF size covers the file
+    with open(path, 'rb') as fp:
+        contents = fp.read()
+    assert len(contents) % 2 == 0
+    assert int.from_bytes(contents[4:8], 'little') == len(contents) - 8
+
+    if format != 'float32':  # The wave module only reads PCM files
+        with wave.open(path) as fp:
+            assert fp.getnchannels() == channels
+            assert fp.getsampwidth() == save.WAVE_FORMATS[format][1]
+            assert fp.getframerate() == 22050
+            assert fp.getnframes() == frames
+
+
+def test_wave_writer_rejects_bad_input(tmp_path):
+    with pytest.raises(ValueError):
+        save.WaveWriter(str(tmp_path / 'out.wav'), format='int8')
+    with save.WaveWriter(str(tmp_path / 'out.wav'), channels=2) as writer:
+        with pytest.raises(ValueError):
+            writer.write(signal(10))
+
+
+@pytest.mark.parametrize('format', sorted(save.WAVE_FORMATS))
+def test_save_wave_stream(tmp_path, format):
+    path = str(tmp_path / 'out.wav')
+    data = signal(10001)
+    save.save_wave((data[start:start + 4096] for start in range(0, len(data), 4096)),
+                   path, format=format)
+    loaded, rate = source.wavefile(path, dtype=numpy.float64)
+    assert rate == 44100
+    numpy.testing.assert_allclose(loaded, data, atol=TOLERANCE[format])
+
+
+def test_save_wave_array(tmp_path):
+    path = str(tmp_path / 'out.wav')
+    data = signal(500, 2)
+    save.save_wave(data, path, rate=8000, format='int24')
+    loaded, rate = source.wavefile(path, mono=False, dtype=numpy.float64)
+    assert rate == 8000
+    numpy.testing.assert_allclose(loaded, data, atol=TOLERANCE['int24'])